@@ -1,105 +1,605 @@
+import asyncio
+import os
 import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-class NxMtpHandler:
+# Seconds a device ID found by list-devices is reused
+DEVICE_ID_TTL = 10
+
+# Don't flash a console window when the exe is started (only exists on Windows)
+_CREATION_FLAGS = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+def _raise_failed(result):
+    """Return the result of one command of a batch, raise it if the command failed"""
+    if isinstance(result, IOError):
+        raise result
+    return result
+
+
+class _Worker:
     def __init__(self, exe_path):
+        """
+        One nx_mtp_sender.exe running in server mode
+
+        Parameters:
+            exe_path (str): Full path to nx_mtp_sender.exe
+        """
+        self._lock = threading.Lock()
+        self._terminated = False
+        self.proc = subprocess.Popen(
+            [exe_path, "--server"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            creationflags=_CREATION_FLAGS,
+        )
+
+    @property
+    def alive(self):
+        """False when the exe has terminated, the worker can't be used any more"""
+        return not self._terminated and self.proc.poll() is None
+
+    def close(self):
+        """Stop the worker"""
+        if self.proc.poll() is not None:
+            return
+        self.proc.stdin.close()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+    def kill(self):
+        """Stop a terminated worker at once, its process may still run and use the device"""
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        for pipe in (self.proc.stdin, self.proc.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    def send_many(self, commands, on_progress=None):
+        """
+        Send several commands to the worker at once and wait for all answers.
+        The commands are written by a second thread so the worker never blocks
+        on a full stdout pipe while we are still writing.
+
+        Parameters:
+            commands (list): Tuples with the command and its arguments
+            on_progress (callable): Optional, gets every progress message (str) of the commands
+
+        Returns:
+            list: The undecoded results (bytes) of the commands in the same order, an IOError
+                  instance for every command that failed
+        """
+        request = "".join("\t".join(command) + "\n" for command in commands).encode("utf-8")
+        with self._lock:
+            if len(commands) == 1:
+                self._write(request)
+                replies = [self._read_reply(on_progress)]
+            else:
+                writer = threading.Thread(target=self._write, args=(request,))
+                writer.start()
+                replies = [self._read_reply(on_progress) for _ in commands]
+                writer.join()
+        results = []
+        for reply in replies:
+            if not reply:
+                self._terminated = True
+                results.append(IOError("nx_mtp_sender.exe has terminated"))
+                continue
+            status, _, payload = reply.rstrip(b"\r\n").partition(b" ")
+            results.append(payload if status == b"OK" else IOError(payload.decode("utf-8", "replace")))
+        return results
+
+    def _write(self, request):
+        """Write a request to the worker, a terminated worker gets no request"""
+        try:
+            self.proc.stdin.write(request)
+            self.proc.stdin.flush()
+        except OSError:
+            # The replies of the commands read EOF
+            self._terminated = True
+
+    def _read_reply(self, on_progress):
+        """Read the reply line of one command, progress lines before it go to on_progress"""
+        while True:
+            reply = self.proc.stdout.readline()
+            if not reply.startswith(b"PROGRESS "):
+                return reply
+            if on_progress:
+                on_progress(reply[9:].rstrip(b"\r\n").decode("utf-8", "replace"))
+
+
+class NxMtpHandler:
+    def __init__(self, exe_path, device_id=None, workers=None):
         """
         MTP Operations Handler
-        
+
+        Starts one nx_mtp_sender.exe in server mode that handles all operations.
+        Batches (copy_many, exists_many, delete_many) are split over up to `workers`
+        exe processes, which are started when a batch needs them. A terminated exe is
+        replaced by a new one before the next operation.
+        Call close() or use the handler as a context manager to stop them.
+
         Parameters:
             exe_path (str): Full path to nx_mtp_sender.exe
+            device_id (str): Optional device ID (e.g. "This PC\\Switch\\SD Card"). When given
+                             the devices are never enumerated.
+            workers (int): Maximum number of exe processes, default min(8, number of CPUs)
         """
         self.exe_path = exe_path
-    
+        self.workers = max(1, workers or min(8, os.cpu_count() or 1))
+        self._fixed_device_id = device_id
+        self._device_id = device_id
+        self._device_id_ts = 0.0
+        # device ID with the path separator, prepended to every device path
+        self._prefix = f"{device_id}\\" if device_id else None
+        self._pool_lock = threading.Lock()
+        self._pool = [_Worker(self.exe_path)]
+        self.proc = self._pool[0].proc
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop all nx_mtp_sender.exe workers"""
+        with self._pool_lock:
+            for worker in self._pool:
+                worker.close()
+
+    def _get_workers(self, count):
+        """Get `count` workers, terminated workers are replaced and missing ones started"""
+        with self._pool_lock:
+            for worker in self._pool:
+                if not worker.alive:
+                    worker.kill()
+            self._pool = [worker if worker.alive else _Worker(self.exe_path) for worker in self._pool]
+            while len(self._pool) < count:
+                self._pool.append(_Worker(self.exe_path))
+            self.proc = self._pool[0].proc
+            return self._pool[:count]
+
+    def _send(self, *args):
+        """
+        Send one command to the worker and wait for its answer
+
+        Parameters:
+            args (str): The command and its arguments
+
+        Returns:
+            bytes: The undecoded result of the command
+
+        Exceptions:
+            IOError: If the command failed
+        """
+        return _raise_failed(self._get_workers(1)[0].send_many([args])[0])
+
+    def _send_many(self, commands, on_progress=None):
+        """
+        Send several commands and wait for all answers. Bigger batches are split into
+        one contiguous part per worker which are executed in parallel.
+
+        Parameters:
+            commands (list): Tuples with the command and its arguments
+            on_progress (callable): Optional, gets the progress messages, called from
+                                    several threads when the batch is split
+
+        Returns:
+            list: The results of the commands in the same order, an IOError instance for
+                  every command that failed
+        """
+        count = min(self.workers, len(commands))
+        if count <= 1:
+            results = [self._get_workers(1)[0].send_many(commands, on_progress)] if commands else []
+        else:
+            workers = self._get_workers(count)
+            part_len = -(-len(commands) // count)
+            parts = [commands[i : i + part_len] for i in range(0, len(commands), part_len)]
+            with ThreadPoolExecutor(max_workers=len(parts)) as executor:
+                results = list(
+                    executor.map(lambda worker, part: worker.send_many(part, on_progress), workers, parts)
+                )
+        return [
+            result if isinstance(result, IOError) else result.decode("utf-8", "replace")
+            for part_results in results
+            for result in part_results
+        ]
+
+    def invalidate_device_cache(self):
+        """Forget the cached device ID, e.g. after another device was connected"""
+        self._device_id = self._fixed_device_id
+        self._device_id_ts = 0.0
+        self._prefix = f"{self._fixed_device_id}\\" if self._fixed_device_id else None
+
     def _get_device_id(self):
-        """Get first device ID from list-devices command"""
-        result = subprocess.run(
-            [self.exe_path, "list-devices"],
-            shell=True,
-            capture_output=True,
-            text=True
-        )
-        devices = result.stdout.splitlines()
+        """Get first device ID from list-devices command, cached for DEVICE_ID_TTL seconds"""
+        if self._fixed_device_id:
+            return self._fixed_device_id
+        if self._device_id and time.monotonic() - self._device_id_ts < DEVICE_ID_TTL:
+            return self._device_id
+        devices = self._send("list-devices")
         if not devices:
             raise Exception("No MTP devices found")
-        return devices[0].split(" | ")[0]
+        self._device_id = devices.split(b"\t", 1)[0].split(b" | ", 1)[0].decode("utf-8", "replace")
+        self._device_id_ts = time.monotonic()
+        self._prefix = f"{self._device_id}\\"
+        return self._device_id
+
+    def _get_prefix(self):
+        """Get the device ID followed by the path separator"""
+        self._get_device_id()
+        return self._prefix
 
-    def copy(self, source_path, destination_path):
+    def copy(self, source_path, destination_path, on_progress=None):
         """
         Copy file/folder to MTP device
-        
+
         Parameters:
             source_path (str): Full local source path
             destination_path (str): Full device destination path (including device ID)
+            on_progress (callable): Optional, called with a message (str) for every copied file
+
+        Exceptions:
+            IOError: If the copy failed
         """
-        device_id = self._get_device_id()
-        full_destination = f"{device_id}\\{destination_path}"
-        
-        result = subprocess.run(
-            [self.exe_path, "copy", source_path, full_destination],
-            shell=True,
-            capture_output=True,
-            text=True
+        return _raise_failed(self.copy_many([(source_path, destination_path)], on_progress)[0])
+
+    def copy_many(self, pairs, on_progress=None):
+        """
+        Copy several files/folders to MTP device in one batch
+
+        Parameters:
+            pairs (list): Tuples of (source_path, destination_path) like for copy
+            on_progress (callable): Optional, like for copy
+
+        Returns:
+            list: The result for every pair, an IOError instance for every pair that failed.
+                  The other pairs are copied anyway.
+        """
+        prefix = self._get_prefix()
+        return self._send_many(
+            [("copy", source_path, prefix + destination_path) for source_path, destination_path in pairs],
+            on_progress,
         )
-        return result.stdout
 
     def exists(self, device_path):
         """Check if path exists on device"""
-        device_id = self._get_device_id()
-        full_path = f"{device_id}\\{device_path}"
-        
-        result = subprocess.run(
-            [self.exe_path, "exists", full_path],
-            shell=True,
-            capture_output=True,
-            text=True
-        )
-        return result.stdout.strip()
+        return _raise_failed(self.exists_many([device_path])[0])
+
+    def exists_many(self, device_paths):
+        """Check for several paths if they exist on device, returns a list of results
+        with an IOError instance for every check that failed"""
+        prefix = self._get_prefix()
+        return self._send_many([("exists", prefix + device_path) for device_path in device_paths])
 
     def delete(self, device_path):
         """Delete file/folder from device"""
-        device_id = self._get_device_id()
-        full_path = f"{device_id}\\{device_path}"
-        
-        result = subprocess.run(
-            [self.exe_path, "delete", full_path],
-            shell=True,
-            capture_output=True,
-            text=True
-        )
-        return result.stdout
+        return _raise_failed(self.delete_many([device_path])[0])
+
+    def delete_many(self, device_paths):
+        """Delete several files/folders from device, returns a list of results
+        with an IOError instance for every deletion that failed"""
+        prefix = self._get_prefix()
+        return self._send_many([("delete", prefix + device_path) for device_path in device_paths])
 
     def size(self, device_path):
         """Get file/folder size on device"""
-        device_id = self._get_device_id()
-        full_path = f"{device_id}\\{device_path}"
-        
-        result = subprocess.run(
-            [self.exe_path, "size", full_path],
-            shell=True,
-            capture_output=True,
-            text=True
+        return self._send("size", self._get_prefix() + device_path).decode("utf-8", "replace")
+
+
+class _AsyncWorker:
+    def __init__(self, proc):
+        """
+        One nx_mtp_sender.exe running in server mode, driven from asyncio
+
+        Parameters:
+            proc (asyncio.subprocess.Process): The started exe
+        """
+        self.proc = proc
+        self._terminated = False
+
+    @property
+    def alive(self):
+        """False when the exe has terminated, the worker can't be used any more"""
+        return not self._terminated and self.proc.returncode is None
+
+    @classmethod
+    async def start(cls, exe_path):
+        """Start nx_mtp_sender.exe in server mode"""
+        proc = await asyncio.create_subprocess_exec(
+            exe_path,
+            "--server",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            creationflags=_CREATION_FLAGS,
+        )
+        return cls(proc)
+
+    async def close(self):
+        """Stop the worker"""
+        if self.proc.returncode is not None:
+            return
+        self.proc.stdin.close()
+        try:
+            await asyncio.wait_for(self.proc.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            self.proc.kill()
+            await self.proc.wait()
+
+    async def kill(self):
+        """Stop a terminated worker at once, its process may still run and use the device"""
+        if self.proc.returncode is None:
+            try:
+                self.proc.kill()
+            except ProcessLookupError:
+                pass
+        await self.proc.wait()
+
+    async def send(self, args, on_progress=None):
+        """
+        Send one command to the worker and wait for its answer
+
+        Parameters:
+            args (tuple): The command and its arguments
+            on_progress (callable): Optional, gets every progress message (str) of the command
+
+        Returns:
+            str: The result of the command
+
+        Exceptions:
+            IOError: If the command failed or the exe has terminated
+        """
+        try:
+            self.proc.stdin.write(("\t".join(args) + "\n").encode("utf-8"))
+            await self.proc.stdin.drain()
+        except OSError:
+            self._terminated = True
+            raise IOError("nx_mtp_sender.exe has terminated")
+        reply = await self.proc.stdout.readline()
+        while reply.startswith(b"PROGRESS "):
+            if on_progress:
+                on_progress(reply[9:].rstrip(b"\r\n").decode("utf-8", "replace"))
+            reply = await self.proc.stdout.readline()
+        if not reply:
+            self._terminated = True
+            raise IOError("nx_mtp_sender.exe has terminated")
+        status, _, payload = reply.rstrip(b"\r\n").partition(b" ")
+        if status != b"OK":
+            raise IOError(payload.decode("utf-8", "replace"))
+        return payload.decode("utf-8", "replace")
+
+
+class AsyncNxMtpHandler:
+    def __init__(self, exe_path, device_id=None, workers=None):
+        """
+        MTP Operations Handler for asyncio applications
+
+        Every operation is sent to an idle nx_mtp_sender.exe in server mode, so up to
+        `workers` operations are in flight at the same time without blocking the event loop.
+        The exe processes are started when they are needed, a terminated one is replaced
+        by a new one. Use the handler with
+        "async with" or call close() to stop them.
+        On Windows subprocesses need the ProactorEventLoop, the default since Python 3.8.
+
+        Parameters:
+            exe_path (str): Full path to nx_mtp_sender.exe
+            device_id (str): Optional device ID (e.g. "This PC\\Switch\\SD Card"). When given
+                             the devices are never enumerated.
+            workers (int): Maximum number of exe processes, default min(8, number of CPUs)
+        """
+        self.exe_path = exe_path
+        self.workers = max(1, workers or min(8, os.cpu_count() or 1))
+        self._fixed_device_id = device_id
+        self._device_id = device_id
+        self._device_id_ts = 0.0
+        self._prefix = f"{device_id}\\" if device_id else None
+        self._pool = []
+        self._started = 0
+        # Idle workers, None stands for a worker that has to be started (again)
+        self._idle = asyncio.Queue()
+        self._device_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Stop all nx_mtp_sender.exe workers"""
+        pool, self._pool = self._pool, []
+        self._started = 0
+        self._idle = asyncio.Queue()
+        await asyncio.gather(*(worker.close() for worker in pool))
+
+    async def _send(self, *args, on_progress=None):
+        """
+        Send one command to an idle worker, start a new one if all are busy
+
+        Parameters:
+            args (str): The command and its arguments
+            on_progress (callable): Optional, gets the progress messages
+
+        Returns:
+            str: The result of the command
+
+        Exceptions:
+            IOError: If the command failed
+        """
+        idle = self._idle
+        if idle.empty() and self._started < self.workers:
+            # count the worker before awaiting so concurrent calls don't exceed the limit
+            self._started += 1
+            worker = None
+        else:
+            worker = await idle.get()
+        if worker is None:
+            try:
+                worker = await _AsyncWorker.start(self.exe_path)
+            except BaseException:
+                # the next call tries to start it again
+                idle.put_nowait(None)
+                raise
+            self._pool.append(worker)
+        try:
+            return await worker.send(args, on_progress)
+        finally:
+            if worker in self._pool:
+                if worker.alive:
+                    idle.put_nowait(worker)
+                else:
+                    self._pool.remove(worker)
+                    idle.put_nowait(None)
+                    await worker.kill()
+
+    async def _send_many(self, commands, on_progress=None):
+        """
+        Send several commands concurrently and wait for all answers
+
+        Parameters:
+            commands (list): Tuples with the command and its arguments
+            on_progress (callable): Optional, gets the progress messages
+
+        Returns:
+            list: The results of the commands in the same order, an IOError instance for
+                  every command that failed
+        """
+
+        async def send(command):
+            try:
+                return await self._send(*command, on_progress=on_progress)
+            except IOError as err:
+                return err
+
+        return list(await asyncio.gather(*(send(command) for command in commands)))
+
+    def invalidate_device_cache(self):
+        """Forget the cached device ID, e.g. after another device was connected"""
+        self._device_id = self._fixed_device_id
+        self._device_id_ts = 0.0
+        self._prefix = f"{self._fixed_device_id}\\" if self._fixed_device_id else None
+
+    async def _get_prefix(self):
+        """Get the first device ID followed by the path separator, cached for DEVICE_ID_TTL seconds"""
+        if self._fixed_device_id:
+            return self._prefix
+        async with self._device_lock:
+            if self._device_id and time.monotonic() - self._device_id_ts < DEVICE_ID_TTL:
+                return self._prefix
+            devices = await self._send("list-devices")
+            if not devices:
+                raise Exception("No MTP devices found")
+            self._device_id = devices.split("\t", 1)[0].split(" | ", 1)[0]
+            self._device_id_ts = time.monotonic()
+            self._prefix = f"{self._device_id}\\"
+            return self._prefix
+
+    async def copy(self, source_path, destination_path, on_progress=None):
+        """
+        Copy file/folder to MTP device
+
+        Parameters:
+            source_path (str): Full local source path
+            destination_path (str): Full device destination path (including device ID)
+            on_progress (callable): Optional, called with a message (str) for every copied file
+        """
+        return await self._send(
+            "copy", source_path, await self._get_prefix() + destination_path, on_progress=on_progress
+        )
+
+    async def copy_many(self, pairs, on_progress=None):
+        """
+        Copy several files/folders to MTP device concurrently
+
+        Parameters:
+            pairs (list): Tuples of (source_path, destination_path) like for copy
+            on_progress (callable): Optional, like for copy
+
+        Returns:
+            list: The result for every pair, an IOError instance for every pair that failed.
+                  The other pairs are copied anyway.
+        """
+        prefix = await self._get_prefix()
+        return await self._send_many(
+            [("copy", source_path, prefix + destination_path) for source_path, destination_path in pairs],
+            on_progress,
+        )
+
+    async def exists(self, device_path):
+        """Check if path exists on device"""
+        return await self._send("exists", await self._get_prefix() + device_path)
+
+    async def exists_many(self, device_paths):
+        """Check for several paths if they exist on device, returns a list of results
+        with an IOError instance for every check that failed"""
+        prefix = await self._get_prefix()
+        return await self._send_many([("exists", prefix + device_path) for device_path in device_paths])
+
+    async def delete(self, device_path):
+        """Delete file/folder from device"""
+        return await self._send("delete", await self._get_prefix() + device_path)
+
+    async def delete_many(self, device_paths):
+        """Delete several files/folders from device, returns a list of results
+        with an IOError instance for every deletion that failed"""
+        prefix = await self._get_prefix()
+        return await self._send_many([("delete", prefix + device_path) for device_path in device_paths])
+
+    async def size(self, device_path):
+        """Get file/folder size on device"""
+        return await self._send("size", await self._get_prefix() + device_path)
+
+
+def example():
+    """Usage example of NxMtpHandler"""
+    with NxMtpHandler("d:\\mypro\\switch patch installer\\installer\\nx_mtp_sender.exe") as handler:
+
+        # Copy file (user provides full paths)
+        copy_result = handler.copy(
+            source_path="D:\\mypro\\switch patch installer\\installer\\-.png",
+            destination_path="retroarch\\Roms\\-.png",
+            on_progress=print
         )
-        return result.stdout.strip()
+        print(copy_result)
+
+        # Check existence
+        exists_result = handler.exists("retroarch\\Roms\\New folder\\- - Copy (2).png")
+        print(exists_result)
 
+        # Delete folder
+        delete_result = handler.delete("retroarch\\Roms\\New folder")
+        print(delete_result)
 
-# Usage Example:
-handler = NxMtpHandler("d:\\mypro\\switch patch installer\\installer\\nx_mtp_sender.exe")
+        # Get file size
+        size_result = handler.size("retroarch\\Roms\\New folder\\- - Copy (2).png")
+        print(size_result)
 
-# Copy file (user provides full paths)
-copy_result = handler.copy(
-    source_path="D:\\mypro\\switch patch installer\\installer\\-.png",
-    destination_path="retroarch\\Roms\\-.png"
-)
-print(copy_result)
 
-# Check existence
-exists_result = handler.exists("retroarch\\Roms\\New folder\\- - Copy (2).png")
-print(exists_result)
+async def async_example():
+    """Usage example of AsyncNxMtpHandler"""
+    async with AsyncNxMtpHandler("d:\\mypro\\switch patch installer\\installer\\nx_mtp_sender.exe") as handler:
+        # The checks run concurrently in separate exe processes
+        print(await asyncio.gather(
+            handler.exists("retroarch\\Roms\\-.png"),
+            handler.size("retroarch\\Roms\\-.png"),
+        ))
 
-# Delete folder
-delete_result = handler.delete("retroarch\\Roms\\New folder")
-print(delete_result)
 
-# Get file size
-size_result = handler.size("retroarch\\Roms\\New folder\\- - Copy (2).png")
-print(size_result)
\ No newline at end of file
+# Run one of the examples: python "class for use exe file on python.py" [sync|async]
+if __name__ == "__main__":
+    if sys.argv[1:] == ["sync"]:
+        example()
+    elif sys.argv[1:] == ["async"]:
+        asyncio.run(async_example())
+    else:
+        sys.exit(f"usage: {sys.argv[0]} [sync|async]")
@@ -4,23 +4,12 @@ Be aware that there is no error handling in these examples. Error handling
 should be used for production code
 """
 
-# import gc
-import mtp.win_access
-import mtp.linux_access
 import os
-import platform
 import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-if platform.system() == "Windows":
-    import mtp.win_access as mtp_access  # pylint: disable=unused-import,wrong-import-position
-
-    on_windows = True
-else:
-    import mtp.linux_access as mtp_access  # pylint: disable=unused-import,wrong-import-position
-
-    on_windows = False
+from mtp import access as mtp_access  # pylint: disable=wrong-import-position
 
 
 TESTNUMBER = 0  # 1 - 9, 0 for all tests
@@ -67,10 +56,11 @@ def test_3_list_childs_with_walk() -> None:
         for i in range(TESTRUNS):
             print(f"Find all childs with walk on test run {i+1}:")
             for storage in dev.get_content():
-                print(f"Walk Storage: {storage.full_filename}")
+                storage_path = storage.full_filename
+                print(f"Walk Storage: {storage_path}")
                 count = 0
                 for _, dirs, files in mtp_access.walk(
-                    dev, storage.full_filename, None, error_function  # pyright: ignore[reportArgumentType]
+                    dev, storage_path, None, error_function  # pyright: ignore[reportArgumentType]
                 ):
                     for _ in dirs:
                         count += 1
@@ -88,7 +78,7 @@ def test_4_get_cont_from_path() -> None:
     for dev in mtp_access.get_portable_devices():
         for i in range(TESTRUNS):
             print(f"Find content of a full qualified path on test run {i+1}:")
-            cont: mtp.win_access.PortableDeviceContent | mtp.linux_access.PortableDeviceContent | None = (
+            cont: mtp_access.PortableDeviceContent | None = (
                 mtp_access.get_content_from_device_path(
                     dev,  # pyright: ignore[reportArgumentType]
                     f"{dev.devicename}/Interner gemeinsamer Speicher/Android/data/com.google.android.apps.maps/cache/diskcache",
@@ -102,14 +92,15 @@ def test_5_create_delete_folder() -> None:
     """Create / Delete Folder"""
     print("Test 5 ------------------------------------------------------------------------")
     for dev in mtp_access.get_portable_devices():
+        stor0 = dev.get_content()[0]
         for i in range(TESTRUNS):
             print(f"Create and delete folder on test run {i+1}:")
-            new_path = os.path.join(dev.get_content()[0].full_filename, "example/temp")
+            new_path = os.path.join(stor0.full_filename, "example/temp")
             cont = mtp_access.makedirs(dev, new_path)  # pyright: ignore[reportArgumentType]
             cont.remove()
             cont = mtp_access.get_content_from_device_path(
                 dev,  # pyright: ignore[reportArgumentType]
-                os.path.join(dev.get_content()[0].full_filename, "example/temp"),
+                new_path,
             )
             if cont is not None:
                 raise IOError("Can't delete folder in test_create_delete_folder")
@@ -121,8 +112,10 @@ def test_6_create_delete_file() -> None:
     """Create / Delete files"""
     print("Test 6 ------------------------------------------------------------------------")
     mtp_filename = "music.mp3"
-    uploadfilename = os.path.join(os.path.dirname(__file__), "music.mp3")
-    downloadfilename = os.path.join(os.path.dirname(__file__), "test.mp3")
+    example_dir = os.path.dirname(__file__)
+    uploadfilename = os.path.join(example_dir, "music.mp3")
+    downloadfilename = os.path.join(example_dir, "test.mp3")
+    uploadsize = os.stat(uploadfilename).st_size
     for dev in mtp_access.get_portable_devices():
         print(f"Device: {dev.devicename}")
         # Create the directory for the new file
@@ -143,53 +136,46 @@ def test_6_create_delete_file() -> None:
                 print(f"Could not create file {mtp_filename}")
                 continue
             # Download the file. If the file in download folder exists, delete it first
-            if os.path.exists(downloadfilename):
+            try:
                 os.remove(downloadfilename)
+            except FileNotFoundError:
+                pass
             print("Downloading file")
             fcont.download_file(downloadfilename)
             # Test if download was successfull and file sizes are the same
-            if not os.path.exists(downloadfilename):
+            try:
+                downloadsize = os.stat(downloadfilename).st_size
+            except FileNotFoundError:
                 print(f"Could not download file test.mp3")
                 continue
-            if os.path.getsize(uploadfilename) != os.path.getsize(downloadfilename):
+            if uploadsize != downloadsize:
                 print(f"Filesizes of uploaded and download file are different.")
             os.remove(downloadfilename)
-            # _ = gc.collect()
         dev.close()
 
 
 def test_7_display_childs() -> None:
-    """test to show all cont, but doesn't use walk.
-    For walking through the content of a directory tree use walk, it's much faster"""
-
-    def show_childs(dev: mtp_access.PortableDevice, root: str) -> None:
-        """Show all cont, but don't use walk"""
-        if cont := mtp_access.get_content_from_device_path(dev, root):  # pyright: ignore[reportArgumentType]
-            for child in cont.get_children():
-                fullpath = child.full_filename
-                if child.content_type == mtp_access.WPD_CONTENT_TYPE_STORAGE:
-                    print(f"S  {fullpath}")
-                elif child.content_type == mtp_access.WPD_CONTENT_TYPE_DIRECTORY:
-                    print(f"D  {fullpath}")
-                elif child.content_type == mtp_access.WPD_CONTENT_TYPE_FILE:
-                    print(f"F  {fullpath} Size: {child.size} Created: {child.date_modified}")
-                else:
-                    print(f"?  {fullpath}")
-                if child.content_type in (
-                    mtp_access.WPD_CONTENT_TYPE_STORAGE,
-                    mtp_access.WPD_CONTENT_TYPE_DIRECTORY,
-                ):
-                    show_childs(dev, fullpath)
-        else:
-            print(f"{root} not found")
+    """test to show all cont of the first storage with walk"""
+
+    def error_function(error: str) -> bool:
+        """Error function"""
+        print(f"Error: {error}")
+        return True
 
     print("Test 7 ------------------------------------------------------------------------")
     for dev in mtp_access.get_portable_devices():
         for i in range(TESTRUNS):
             print(f"Display childs on test run {i+1}:")
             for storage in dev.get_content():
-                print(f"Storage: {storage.full_filename}")
-                show_childs(dev, storage.full_filename)
+                storage_path = storage.full_filename
+                print(f"Storage: {storage_path}")
+                for _, dirs, files in mtp_access.walk(
+                    dev, storage_path, None, error_function  # pyright: ignore[reportArgumentType]
+                ):
+                    for directory in dirs:
+                        print(f"D  {directory.full_filename}")
+                    for file in files:
+                        print(f"F  {file.full_filename} Size: {file.size} Created: {file.date_modified}")
                 break
         print("Closing device")
         dev.close()
@@ -199,12 +185,13 @@ def test_8_get_path() -> None:
     """Test get content from partial and fully qualified path"""
     print("Test 8 ------------------------------------------------------------------------")
     for dev in mtp_access.get_portable_devices():
+        stor = dev.get_content()[0]
+        camera_path = f"{stor.full_filename}/DCIM/Camera"
         for i in range(TESTRUNS):
             print(f"Get content from fully and partialy qualified filename on test run {i+1}:")
-            stor = dev.get_content()[0]
-            cont = stor.get_path(f"{stor.full_filename}/DCIM/Camera")
+            cont = stor.get_path(camera_path)
             print(cont.full_filename if cont is not None else "DCIM/Camera with full name not found")
-            cont = stor.get_path(f"DCIM/Camera")
+            cont = stor.get_path("DCIM/Camera")
             print(cont.full_filename if cont is not None else "DCIM/Camera with name not found")
         dev.close()
 
@@ -213,10 +200,11 @@ def test_9_create_content() -> None:
     """Test to create a folder with create_content"""
     print("Test 9 ------------------------------------------------------------------------")
     for dev in mtp_access.get_portable_devices():
+        stor = dev.get_content()[0]
+        mymusic_path = f"{stor.full_filename}/MyMusic"
         for i in range(TESTRUNS):
             print(f"Create a folder with create_content on test run {i+1}:")
-            stor = dev.get_content()[0]
-            mycont = stor.get_path(f"{stor.full_filename}/MyMusic")
+            mycont = stor.get_path(mymusic_path)
             if mycont:
                 mycont.remove()
             cont = stor.create_content("MyMusic")
@@ -229,9 +217,9 @@ def test_10_get_child() -> None:
     """Test get_child for directories"""
     print("Test 10------------------------------------------------------------------------")
     for dev in mtp_access.get_portable_devices():
+        stor = dev.get_content()[0]
         for i in range(TESTRUNS):
             print(f"Test get_child on test run {i+1}:")
-            stor = dev.get_content()[0]
             mycont = stor.get_child("DCIM")
             if mycont is None or mycont.content_type != mtp_access.WPD_CONTENT_TYPE_DIRECTORY:
                 dev.close()
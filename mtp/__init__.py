@@ -21,4 +21,24 @@ Implemented modules:
 - 'win_access': Provide several methods to access the file system on MTP devices under Windows.
 - 'linux_access': Provide several methods to access the file system on MTP devices under Linux.
 - 'dialog': Provides a class to get a directory selection dialog for MTP devices with tkinter.
+
+The package attribute 'access' is 'win_access' on Windows and 'linux_access' on
+all other systems. It is imported on first use, so "import mtp" doesn't load
+comtypes or libmtp:
+
+    >>> from mtp import access
+    >>> devs = access.get_portable_devices()
 """
+
+import importlib
+import platform
+from types import ModuleType
+
+
+def __getattr__(name: str) -> ModuleType:
+    """Import the backend for this platform when 'access' is used the first time"""
+    if name == "access":
+        module = importlib.import_module("mtp.win_access" if platform.system() == "Windows" else "mtp.linux_access")
+        globals()["access"] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -20,7 +20,9 @@ Examples:
     >>> adir = dialog.AskDirectory(root, "Test ask_directory", ("Alls well", "Don't do it"))
 """
 
-import contextlib
+from __future__ import annotations
+
+import collections.abc
 from dataclasses import dataclass
 import platform
 import tkinter
@@ -30,10 +32,7 @@ from tkinter.ttk import Button
 from tkinter.ttk import Frame
 from typing import override
 
-import mtp.win_access
-import mtp.linux_access
-
-if platform.system() == "windows":
+if platform.system() == "Windows":
     from . import win_access as access
 else:
     from . import linux_access as access
@@ -59,6 +58,12 @@ CvmQ4YKICkT6KDRiwYNdDD/2YExSwq6HDTvyYHySgsMJEw1y4FF4ZQKBBAsAwLCjsAwJBQcMCOCx
 OCEcIDN0FImiRm7CP2vMkPHyBQ2ctAP71HHTBs4e2AIDAgA7
 """
 
+# Number of directory entries after which the tree is redrawn while a directory is read
+INSERT_CHUNK_SIZE = 64
+
+# Content types that are shown in the tree
+_ALLOWED_TYPES = frozenset({access.WPD_CONTENT_TYPE_STORAGE, access.WPD_CONTENT_TYPE_DIRECTORY})
+
 # ------------------------------------------------------------------------------------------------
 
 
@@ -83,6 +88,9 @@ class AskDirectory(tkinter.simpledialog.Dialog):  # pylint: disable=too-many-ins
         IOError: exceptions if something went wrong
     """
 
+    # the icon is shared by all dialogs of the same Tk instance
+    _smartphone_icon_cache: tkinter.PhotoImage | None = None
+
     def __init__(
         self,
         parent: tkinter.Tk,
@@ -100,15 +108,28 @@ class AskDirectory(tkinter.simpledialog.Dialog):  # pylint: disable=too-many-ins
         self._parent: tkinter.Tk = parent
         self._dialog_title: str = title
         self._tree: ttk.Treeview
-        self._smartphone_icon: tkinter.PhotoImage = tkinter.PhotoImage(data=SMARTPHONE_ICON)
+        self._smartphone_icon: tkinter.PhotoImage = self._get_smartphone_icon(parent)
         self._buttons: tuple[str, str] = buttons
         self._tree_entries: dict[str, _TreeEntry] = {}
+        # invisible children of the devices that show the expand arrow until the storages are read
+        self._placeholders: dict[str, str] = {}
+        # nodes opened by the user that still have to be loaded, see _drain_opens
+        self._pending_opens: dict[str, None] = {}
+        self._draining: bool = False
         # external variables
         self.answer: str = ""
         self.wpd_device: access.PortableDevice | None = None
         tkinter.simpledialog.Dialog.__init__(self, parent, title=title)
         self.update_idletasks()
 
+    @classmethod
+    def _get_smartphone_icon(cls, parent: tkinter.Tk) -> tkinter.PhotoImage:
+        """Get the device icon, it's only created again for a new Tk instance"""
+        icon: tkinter.PhotoImage | None = cls._smartphone_icon_cache
+        if icon is None or icon.tk is not parent.tk:
+            icon = cls._smartphone_icon_cache = tkinter.PhotoImage(master=parent, data=SMARTPHONE_ICON)
+        return icon
+
     @override
     def buttonbox(self) -> None:
         """Create own buttons"""
@@ -129,7 +150,7 @@ class AskDirectory(tkinter.simpledialog.Dialog):  # pylint: disable=too-many-ins
         self._tree = ttk.Treeview(master=box, height=20, show="tree")
         _ = self._tree.column("#0", width=500)
         _ = self._tree.bind("<<TreeviewOpen>>", self._on_treeselect)
-        # adding data, get devices
+        # adding data, get devices. The storages are read when a device is opened.
         for dev in access.get_portable_devices():
             if devicename := dev.devicename:
                 treeid: str = self._tree.insert(
@@ -140,68 +161,92 @@ class AskDirectory(tkinter.simpledialog.Dialog):  # pylint: disable=too-many-ins
                     image=self._smartphone_icon,
                 )
                 self._tree_entries[treeid] = _TreeEntry(dev, content=None, child_treeids=[], content_loaded=False)
-                _ = self.config(cursor="watch")
-                self.update_idletasks()
-                self._process_directory(insert_after_id=treeid)
-                _ = self.config(cursor="")
+                self._placeholders[treeid] = self._tree.insert(parent=treeid, index=tkinter.END, text="")
         # place the Treeview widget on the root window
         self._tree.pack(side=tkinter.TOP, fill=tkinter.BOTH, expand=True)
 
     def _process_directory(self, insert_after_id: str) -> None:
         """Insert directory listing until depth is 0"""
         treeentry: _TreeEntry = self._tree_entries[insert_after_id]
-        cont: list[mtp.win_access.PortableDeviceContent | mtp.linux_access.PortableDeviceContent] = (
-            list(treeentry.content.get_children())
-            if treeentry.content is not None
-            else list(treeentry.dev.get_content())
+        cont: collections.abc.Iterable[access.PortableDeviceContent] = (
+            treeentry.content.get_children() if treeentry.content is not None else treeentry.dev.get_content()
         )
-        if len(cont) == 0:  # no children
-            return
-        for child in cont:
-            if child.content_type not in (
-                access.WPD_CONTENT_TYPE_STORAGE,
-                access.WPD_CONTENT_TYPE_DIRECTORY,
-            ):
-                continue
-            with contextlib.suppress(tkinter.TclError):
+        # the new entries are collected locally and added to the dialog state in one step
+        new_entries: dict[str, _TreeEntry] = {}
+        try:
+            for count, child in enumerate(cont, start=1):
+                # let Tk draw the rows inserted so far while big directories are still read
+                if count % INSERT_CHUNK_SIZE == 0:
+                    self._tree.update_idletasks()
+                if child.content_type not in _ALLOWED_TYPES:
+                    continue
                 treeid: str = self._tree.insert(
                     parent=insert_after_id,
                     index=tkinter.END,
                     text=child.name,
                     open=False,
                 )
-                self._tree_entries[treeid] = _TreeEntry(
+                new_entries[treeid] = _TreeEntry(
                     dev=treeentry.dev, content=child, child_treeids=[], content_loaded=False
                 )
-                treeentry.child_treeids.append(treeid)
-        self._tree_entries[insert_after_id].content_loaded = True
+        except tkinter.TclError:  # the tree was destroyed, e.g. the dialog was closed
+            pass
+        finally:
+            # every inserted row needs its entry, also when the listing stopped early. The
+            # placeholder is gone, so reading the directory again would insert the rows twice.
+            self._tree_entries.update(new_entries)
+            treeentry.child_treeids.extend(new_entries)
+            treeentry.content_loaded = True
 
     def _on_treeselect(self, _: tkinter.Event) -> None:
         """Will be called on very selection"""
         treeid: str = self._tree.focus()
         status: bool = self._tree.item(treeid, "open")
         if not status:
+            # opened nodes are collected and loaded together when Tk is idle again
+            self._pending_opens[treeid] = None
+            if not self._draining:
+                self._draining = True
+                _ = self.after(0, self._drain_opens)
+        else:
+            self._tree.item(treeid, open=False)
+
+    def _drain_opens(self) -> None:
+        """Load and open all nodes that were opened since the last call"""
+        treeids: list[str] = list(self._pending_opens)
+        self._pending_opens.clear()
+        if any(
+            treeid in self._placeholders
+            or not all(self._tree_entries[c_id].content_loaded for c_id in self._tree_entries[treeid].child_treeids)
+            for treeid in treeids
+        ):
+            # only show the watch cursor once and only if something has to be read
             __ = self.config(cursor="watch")
             self.update_idletasks()
-            for c_id in self._tree_entries[treeid].child_treeids:
-                if not self._tree_entries[c_id].content_loaded:
-                    self._process_directory(insert_after_id=c_id)
+            for treeid in treeids:
+                if treeid in self._placeholders:
+                    self._tree.delete(self._placeholders.pop(treeid))
+                    self._process_directory(insert_after_id=treeid)
+                for c_id in self._tree_entries[treeid].child_treeids:
+                    if not self._tree_entries[c_id].content_loaded:
+                        self._process_directory(insert_after_id=c_id)
             __ = self.config(cursor="")
+        for treeid in treeids:
             self._tree.item(treeid, open=True)
+        if self._pending_opens:
+            _ = self.after(0, self._drain_opens)
         else:
-            self._tree.item(treeid, open=False)
+            self._draining = False
 
     def _on_ok(self) -> None:
         """OK Button"""
         self.withdraw()
         self.update_idletasks()
         treeid: str = self._tree.focus()
-        if treeid == "":
+        if treeid not in self._tree_entries:  # nothing or a placeholder selected
             self.cancel()
         else:
-            cont: mtp.win_access.PortableDeviceContent | mtp.linux_access.PortableDeviceContent | None = (
-                self._tree_entries[treeid].content
-            )
+            cont: access.PortableDeviceContent | None = self._tree_entries[treeid].content
             if cont is None:
                 self.cancel()
                 return
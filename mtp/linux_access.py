@@ -24,7 +24,10 @@ The module contains the following functions:
 - 'get_content_from_device_path' - Get the content (files, dirs) of a path as instances of
     PortableDeviceContent
 - 'walk' - Iterates ower all files in a tree.
+- 'flat_walk' - Lists all files in a tree as lists of names, sizes, types and dates.
 - 'makedirs' - Creates the directories on the MTP device if they don't exist.
+- 'clear_cache' - Forget the cached directory listings.
+- 'invalidate_device_cache' - Forget the MTP devices detected by libmtp.
 
 The module contains the following classes:
 
@@ -52,16 +55,21 @@ Examples:
 
 """
 
-from subprocess import Popen
-
-
 import collections.abc
+from concurrent.futures import Future, ThreadPoolExecutor
 import ctypes
 import datetime
+import errno
+from operator import attrgetter
 import os
+import re
 import shutil
+import signal
+from stat import S_ISDIR
 import subprocess
-from typing import Callable, Literal, override
+import threading
+import time
+from typing import Callable, TypeAlias, override
 import urllib.parse
 
 
@@ -75,48 +83,355 @@ WPD_CONTENT_TYPE_DIRECTORY = 1
 WPD_CONTENT_TYPE_FILE = 2
 WPD_CONTENT_TYPE_DEVICE = 3
 
+# Content types walk descends into
+_DIR_TYPES = frozenset({WPD_CONTENT_TYPE_STORAGE, WPD_CONTENT_TYPE_DIRECTORY})
+
 # Constants for delete
 WPD_DELETE_NO_RECURSION = 0
 WPD_DELETE_WITH_RECURSION = 1
 
+# Seconds the USB devices detected by libmtp are reused, as long as no USB device is plugged in or out
+DEVICE_CACHE_TTL = 2.0
+_RawDevices: TypeAlias = "list[ctypes._Pointer[pylibmtp.LIBMTP_RawDevice]]"  # pyright: ignore[reportPrivateUsage]
+_raw_devices_cache: "tuple[float, tuple[tuple[str, int], ...], _RawDevices] | None" = None
+
+# Bytes copied per call when files are copied inside the kernel, buffer size for the fallback copy
+_COPY_CHUNK_SIZE = 4 * 1024 * 1024
+_COPY_BUFFER_SIZE = 1024 * 1024
+# Errors that mean the kernel can't copy between these two files
+_NO_KERNEL_COPY = frozenset({errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF})
+
+# sysfs directory with the USB devices and their interfaces
+_SYSFS_USB_DEVICES = "/sys/bus/usb/devices"
+# Seconds the programs that use the MTP device get to end after SIGTERM, then they get SIGKILL
+_KILL_TIMEOUT = 2.0
+# lsusb line of a device in MTP mode, used without sysfs, gives bus and device number
+_LSUSB_MTP_DEVICE = re.compile(rb"^Bus (\d+) Device (\d+): .*\(MTP mode\)\s*$", re.IGNORECASE | re.MULTILINE)
+
+# Sort keys for PortableDeviceContent
+_BY_NAME = attrgetter("name")
+_BY_PATH = attrgetter("full_filename")
+
+# date_modified of contents without a date, shared by all of them
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+# libmtp filetype of folders
+_LIBMTP_FOLDER: int = pylibmtp.LIBMTP_Filetype["FOLDER"].value  # pyright: ignore[reportAny]
+
 _libmtp: pylibmtp.MTP | None = None
+# libmtp is only initialized once and devices are opened one after the other, libmtp and libusb
+# setup and Open_Raw_Device are not thread-safe
+_libmtp_lock = threading.Lock()
 _gvfs_found = True
 _gvfs_search_path = f"/run/user/{os.getuid()}/gvfs"  # path for gvfs miunted devices
 
+# Cache for directory listings of gvfs mounted devices and libmtp folders, the least recently
+# used entries are removed when there are more than LISTDIR_CACHE_SIZE, entries older than
+# LISTDIR_CACHE_TTL seconds are read again. Changes done with this module remove the affected entries.
+# Only walk and flat_walk use it by default, the other functions read the device unless they get
+# use_cache=True, so changes done by other programs are seen at once.
+LISTDIR_CACHE_SIZE = 4096
+LISTDIR_CACHE_TTL = 5.0
+_listdir_cache: collections.OrderedDict[str, tuple[float, list[os.DirEntry[str]]]] = collections.OrderedDict()
+# libmtp children are (item_id, filename, filetype, filesize, modificationdate), the key is
+# (device, storage_id, folder id) and the value has the children and the children by name
+_MtpChild: TypeAlias = tuple[int, str, int, int, int]
+_MtpListing: TypeAlias = tuple[float, list[_MtpChild], dict[str, _MtpChild]]
+_mtp_listing_cache: "collections.OrderedDict[tuple[PortableDevice, int, int], _MtpListing]" = collections.OrderedDict()
+_listdir_lock = threading.Lock()  # walk fills the caches from several threads
+
 
 # -------------------------------------------------------------------------------------------------
 # Internal functions
 
 
+def _usb_fingerprint() -> tuple[tuple[str, int], ...]:
+    """Get the modification times of the USB bus directories in /dev, they change whenever a
+    device is plugged in or out"""
+    try:
+        with os.scandir("/dev/bus/usb") as buses:
+            return tuple(sorted((bus.name, bus.stat().st_mtime_ns) for bus in buses))
+    except OSError:
+        return ()
+
+
+def _detect_raw_devices() -> _RawDevices:
+    """Get the MTP devices found by libmtp, the last result is reused for DEVICE_CACHE_TTL seconds
+    if the USB devices didn't change"""
+    global _raw_devices_cache
+    if _libmtp is None:
+        raise OSError("Can't init libmtp")
+    now = time.monotonic()
+    fingerprint = _usb_fingerprint()
+    if _raw_devices_cache is not None:
+        timestamp, cached_fingerprint, raw_devices = _raw_devices_cache
+        if now - timestamp < DEVICE_CACHE_TTL and cached_fingerprint == fingerprint:
+            return raw_devices
+    raw_devices = list(_libmtp.detect_devices())  # type: ignore
+    _raw_devices_cache = (now, fingerprint, raw_devices)
+    return raw_devices
+
+
+def _kernel_copy(copy_chunk: Callable[[int, int, int], int], infd: int, outfd: int, size: int) -> bool:
+    """Copy from infd to outfd with copy_chunk(infd, outfd, count) until the end of the file.
+    Returns False if the kernel can't copy these files, that is only detected before the first byte."""
+    copied = 0
+    while copied < size:
+        try:
+            count = copy_chunk(infd, outfd, _COPY_CHUNK_SIZE)
+        except OSError as err:
+            if copied == 0 and err.errno in _NO_KERNEL_COPY:
+                return False
+            raise
+        if count == 0:
+            # Some filesystems report 0 instead of an error if they don't support it
+            return copied != 0
+        copied += count
+    return True
+
+
+def _fast_copy(src: str, dst: str) -> None:
+    """Copy the content of file src to dst. The data is copied inside the kernel with
+    copy_file_range or sendfile if possible, else with a big buffer."""
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        size = os.fstat(infd).st_size
+        if size == 0:
+            return
+        if hasattr(os, "copy_file_range") and _kernel_copy(os.copy_file_range, infd, outfd, size):
+            return
+        if _kernel_copy(lambda infd, outfd, count: os.sendfile(outfd, infd, None, count), infd, outfd, size):
+            return
+        shutil.copyfileobj(fsrc, fdst, _COPY_BUFFER_SIZE)
+
+
+def _prefetch_file(path: str) -> None:
+    """Ask the kernel to read the file path into the page cache in the background, so reading it
+    overlaps with the USB transfer of the file before it"""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _read_sysfs(dirpath: str, name: str) -> str:
+    """Read one attribute file of a sysfs directory, an empty string if it doesn't exist"""
+    try:
+        with open(os.path.join(dirpath, name), encoding="utf-8", errors="replace") as inp:
+            return inp.read().strip()
+    except OSError:
+        return ""
+
+
+def _find_mtp_device_nodes() -> list[str]:
+    """Get the /dev/bus/usb nodes of all USB devices with an MTP interface from sysfs. Like the
+    "(MTP mode)" of lsusb the interface string must contain MTP, plain PTP devices like cameras
+    and scanners are not used."""
+    nodes: list[str] = []
+    with os.scandir(_SYSFS_USB_DEVICES) as entries:
+        for entry in entries:
+            # Interfaces are named <device>:<config>.<interface>, e.g. 1-2:1.0
+            device, sep, _ = entry.name.partition(":")
+            if not sep:
+                continue
+            if "MTP" not in _read_sysfs(entry.path, "interface").upper():
+                continue
+            device_path = os.path.join(_SYSFS_USB_DEVICES, device)
+            try:
+                bus, dev = int(_read_sysfs(device_path, "busnum")), int(_read_sysfs(device_path, "devnum"))
+            except ValueError:
+                continue
+            node = f"/dev/bus/usb/{bus:03d}/{dev:03d}"
+            if node not in nodes:
+                nodes.append(node)
+    return nodes
+
+
+def _uses_device_nodes(proc_path: str, nodes: list[str]) -> bool:
+    """Check if the process in /proc/<pid> has one of the device nodes open"""
+    try:
+        with os.scandir(os.path.join(proc_path, "fd")) as fds:
+            for fd in fds:
+                try:
+                    if os.readlink(fd.path) in nodes:
+                        return True
+                except OSError:
+                    # The file was closed meanwhile
+                    continue
+    except OSError:
+        # Process has ended or belongs to another user
+        pass
+    return False
+
+
+def _signal_processes(proc_paths: list[str], signum: int) -> None:
+    """Send signum to the processes /proc/<pid>, ended processes are ignored"""
+    for proc_path in proc_paths:
+        pid = os.path.basename(proc_path)
+        try:
+            os.kill(int(pid), signum)
+        except ProcessLookupError:
+            pass
+        except PermissionError as err:
+            raise IOError(f"Can't kill program {pid} that uses libmtp") from err
+
+
+def _kill_device_users(nodes: list[str]) -> None:
+    """End all processes that have one of the device nodes open. They get SIGTERM first,
+    the ones still using the device after _KILL_TIMEOUT seconds get SIGKILL."""
+    own_pid = os.getpid()
+    with os.scandir("/proc") as procs:
+        users = [
+            proc.path
+            for proc in procs
+            if proc.name.isdigit() and int(proc.name) != own_pid and _uses_device_nodes(proc.path, nodes)
+        ]
+    if not users:
+        return
+    _signal_processes(users, signal.SIGTERM)
+    deadline = time.monotonic() + _KILL_TIMEOUT
+    while users := [proc_path for proc_path in users if _uses_device_nodes(proc_path, nodes)]:
+        if time.monotonic() >= deadline:
+            _signal_processes(users, signal.SIGKILL)
+            return
+        time.sleep(0.05)
+
+
 def _init_libmtp() -> None:
     """Kills all prgs that use libmtp and connect to libmtp.
     The killed programm will be restarted when needed (tested with Gnome)"""
     global _libmtp, _gvfs_found
     _gvfs_found = False
-    if _libmtp is not None:
-        return
+    with _libmtp_lock:
+        if _libmtp is None:
+            _connect_libmtp()
+
+
+def _connect_libmtp() -> None:
+    """Does the work for _init_libmtp, must be called with _libmtp_lock held"""
+    global _libmtp
     # Kill any process that uses libmtp
-    # Getting MTP devices from lsusb
-    pl: Popen[bytes] = subprocess.Popen("lsusb", stdout=subprocess.PIPE, shell=True)
-    (output, _) = pl.communicate()
-    if pl.wait() != 0:
+    if os.path.isdir(_SYSFS_USB_DEVICES):
+        if nodes := _find_mtp_device_nodes():
+            _kill_device_users(nodes)
+        _libmtp = pylibmtp.MTP()
+        return
+    # No sysfs, getting MTP devices from lsusb
+    pl = subprocess.run(["lsusb"], capture_output=True, check=False)
+    if pl.returncode != 0:
         raise IOError("Can't get output from lsusb!")
-    for o in output.decode("ascii").split("\n"):
-        if o.upper().endswith("(MTP MODE)"):
-            bus: str = o[4:7]
-            dev: str = o[15:18]
-            # Get programm that uses libmtp return pid
-            pf: Popen[bytes] = subprocess.Popen(f"fuser -k /dev/bus/usb/{bus}/{dev}", stdout=subprocess.PIPE, shell=True)
-            (output, _) = pf.communicate()
-            if pf.wait() != 0:
-                if len(output) != 0:
-                    raise IOError(f'Can\'t get programs that use libmtp: {output.decode("utf-8")}')
-                else:
-                    # No prg using ist
-                    continue
+    for match in _LSUSB_MTP_DEVICE.finditer(pl.stdout):
+        bus: str = match.group(1).decode("ascii")
+        dev: str = match.group(2).decode("ascii")
+        # Get programm that uses libmtp return pid
+        pf = subprocess.run(["fuser", "-k", f"/dev/bus/usb/{bus}/{dev}"], capture_output=True, check=False)
+        if pf.returncode != 0:
+            if len(pf.stdout) != 0:
+                raise IOError(f'Can\'t get programs that use libmtp: {pf.stdout.decode("utf-8")}')
+            else:
+                # No prg using ist
+                continue
     _libmtp = pylibmtp.MTP()
 
 
+def _cached_scandir(path: str, use_cache: bool) -> list[os.DirEntry[str]]:
+    """Get the entries of a directory, from the cache if use_cache is true and it was read in the last
+    LISTDIR_CACHE_TTL seconds. An empty list is returned if path doesn't exist or isn't a directory."""
+    now = time.monotonic()
+    with _listdir_lock:
+        if use_cache and (cached := _listdir_cache.get(path)) is not None and now - cached[0] < LISTDIR_CACHE_TTL:
+            _listdir_cache.move_to_end(path)
+            return cached[1]
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except (FileNotFoundError, NotADirectoryError):
+        with _listdir_lock:
+            _ = _listdir_cache.pop(path, None)
+        return []
+    with _listdir_lock:
+        _listdir_cache[path] = (now, entries)
+        _listdir_cache.move_to_end(path)
+        while len(_listdir_cache) > LISTDIR_CACHE_SIZE:
+            _ = _listdir_cache.popitem(last=False)
+    return entries
+
+
+def _cached_mtp_children(
+    dev: "PortableDevice", storage_id: int, entry_id: int, use_cache: bool
+) -> tuple[list[_MtpChild], dict[str, _MtpChild]]:
+    """Get the children of a libmtp folder and the children by name, from the cache if use_cache is
+    true and they were read in the last LISTDIR_CACHE_TTL seconds. If names are used twice the first
+    child is found."""
+    key = (dev, storage_id, entry_id)
+    now = time.monotonic()
+    with _listdir_lock:
+        if use_cache and (cached := _mtp_listing_cache.get(key)) is not None and now - cached[0] < LISTDIR_CACHE_TTL:
+            _mtp_listing_cache.move_to_end(key)
+            return cached[1], cached[2]
+    # name, type, size and date of all children come with one request
+    with dev._transfer_lock:  # pyright: ignore[reportPrivateUsage]
+        children = dev.libmntp_device.get_children_with_props(storage_id, entry_id)
+    by_name: dict[str, _MtpChild] = {}
+    for child in children:
+        _ = by_name.setdefault(child[1], child)
+    with _listdir_lock:
+        _mtp_listing_cache[key] = (now, children, by_name)
+        _mtp_listing_cache.move_to_end(key)
+        while len(_mtp_listing_cache) > LISTDIR_CACHE_SIZE:
+            _ = _mtp_listing_cache.popitem(last=False)
+    return children, by_name
+
+
+def _forget_mtp_listings(dev: "PortableDevice", folder: tuple[int, int] | None = None) -> None:
+    """Remove the cached libmtp listing of one folder (storage_id, entry_id), or all listings of
+    dev if no folder is given"""
+    with _listdir_lock:
+        if folder is not None:
+            _ = _mtp_listing_cache.pop((dev, *folder), None)
+            return
+        for key in [key for key in _mtp_listing_cache if key[0] is dev]:
+            del _mtp_listing_cache[key]
+
+
+def _gvfs_content(dev: "PortableDevice", dirpath: str) -> "PortableDeviceContent | None":
+    """The content of dirpath on gvfs, None if it doesn't exist. Existence, type, size and
+    date_modified all come from one stat."""
+    try:
+        stat = os.stat(dev._gvfs_prefix + dirpath)  # pyright: ignore[reportPrivateUsage]
+    except OSError:
+        return None
+    return PortableDeviceContent(
+        dev,
+        dirpath,
+        1,
+        1,
+        WPD_CONTENT_TYPE_DIRECTORY if S_ISDIR(stat.st_mode) else WPD_CONTENT_TYPE_FILE,
+        stat_result=stat,
+    )
+
+
+def _forget_listing(path: str) -> None:
+    """Remove the cached listings that are affected by a change of path: path itself, the
+    directories below it and the directories above it."""
+    below = path + os.sep
+    with _listdir_lock:
+        for cached in [
+            cached
+            for cached in _listdir_cache
+            if cached == path or cached.startswith(below) or below.startswith(cached + os.sep)
+        ]:
+            del _listdir_cache[cached]
+
+
 # -------------------------------------------------------------------------------------------------
 class PortableDevice:
     """Class with the infos for a connected portable device.
@@ -149,7 +464,15 @@ class PortableDevice:
         self.serialnumber: str = "Unknown"
         self.device_start_part: str
         self.devicename: str
-        if type(device) == str:
+        # storages read by get_portable_devices, returned by the next get_content call
+        self._probed_storages: list["PortableDeviceContent"] | None = None
+        # libmtp storages by full_filename, filled by get_content and used to resolve paths
+        self._storages_by_name: dict[str, "PortableDeviceContent"] | None = None
+        # libmtp handles one request per device at a time, walk lists directories in other threads
+        self._transfer_lock = threading.Lock()
+        # the gvfs path of a content is this prefix followed by its full_filename
+        self._gvfs_prefix: str = ""
+        if isinstance(device, str):
             self._device: str = device
             if "=" in device:
                 self.device_start_part, self.devicename = device.split(sep="=", maxsplit=1)
@@ -157,6 +480,7 @@ class PortableDevice:
             else:
                 self.device_start_part = ""
                 self.devicename = device
+            self._gvfs_prefix = f"{_gvfs_search_path}{os.sep}{self.device_start_part}"
             if "_" in self.devicename:
                 parts: list[str] = self.devicename.split(sep="_")
                 try:
@@ -171,8 +495,9 @@ class PortableDevice:
             # greps libmtp back is very small
             if _libmtp is None:
                 _init_libmtp()
-            self.libmntp_device: pylibmtp.MTP = pylibmtp.MTP(device)
-            self.libmntp_device.connect()
+            with _libmtp_lock:
+                self.libmntp_device: pylibmtp.MTP = pylibmtp.MTP(device)
+                self.libmntp_device.connect()
             self.name = self.libmntp_device.get_devicename()
             self.description = self.libmntp_device.get_modelname()
             if self.name == "":
@@ -183,6 +508,8 @@ class PortableDevice:
     def close(self) -> None:
         """Close the connection to the device. This must be called when the device is no more needed."""
         if not _gvfs_found:
+            _forget_mtp_listings(self)
+            self._storages_by_name = None
             self.libmntp_device.disconnect()
 
     def get_content(self) -> list["PortableDeviceContent"]:
@@ -204,18 +531,23 @@ class PortableDevice:
             'PortableDeviceContent Interner '
             >>> dev[0].close()
         """
+        if (probed := self._probed_storages) is not None:
+            self._probed_storages = None
+            if not _gvfs_found:
+                self._storages_by_name = {stor.full_filename: stor for stor in probed}
+            return probed
         ret_objs: list["PortableDeviceContent"] = []
         if _gvfs_found:
             try:
                 for entry in os.listdir(os.path.join(_gvfs_search_path, self._device)):
-                    full_name = os.path.join(self.devicename, entry)
+                    full_name = f"{self.devicename}{os.sep}{entry}"
                     ret_objs.append(PortableDeviceContent(self, full_name, 0, 0, WPD_CONTENT_TYPE_STORAGE))
             except OSError as err:
                 raise IOError(f"Can't access {self.devicename}.") from err
         else:
             try:
                 for entry in self.libmntp_device.get_storage():
-                    full_name = os.path.join(self.devicename, entry[0])
+                    full_name = f"{self.devicename}{os.sep}{entry[0]}"
                     pdc: PortableDeviceContent = PortableDeviceContent(
                         port_device=self,
                         dirpath=full_name,
@@ -226,7 +558,8 @@ class PortableDevice:
                     ret_objs.append(pdc)
             except pylibmtp.CommandFailed as err:
                 raise IOError(f"Can't access {self.devicename}.") from err
-        ret_objs.sort(key=lambda entry: entry.name)
+            self._storages_by_name = {stor.full_filename: stor for stor in ret_objs}
+        ret_objs.sort(key=_BY_NAME)
         return ret_objs
 
     @override
@@ -245,13 +578,16 @@ class PortableDeviceContent:  # pylint: disable=too-many-instance-attributes
         get_path: Returns a PortableDeviceContent for a child who's path in the tree is known.
         create_content: Creates an empty directory content in this content.
         upload_file: Upload of a file to MTP device.
+        upload_files: Upload of several files into the same directory of the MTP device.
+        files_to_upload: Filter the files that are already on the MTP device.
         download_file: Download a file from MTP device.
+        download_files: Download of several files from the same directory of the MTP device.
         remove: Deletes the current directory or file.
 
     Attributes:
         name: Directory-/Filename of this content
         fullname: The full path name
-        date_modified: The file modification date
+        date_modified: The file modification date, 1970-01-01 for directories and storages
         size: The size of the file in bytes
         content_type: Type of the entry. One of the WPD_CONTENT_TYPE_ constants:
 
@@ -265,6 +601,19 @@ class PortableDeviceContent:  # pylint: disable=too-many-instance-attributes
         IOError: If something went wrong
     """
 
+    # walk creates one instance per file, without __dict__ they need much less memory
+    __slots__ = (
+        "_port_device",
+        "full_filename",
+        "name",
+        "storage_id",
+        "entry_id",
+        "content_type",
+        "_size",
+        "_mtime",
+        "_stat_source",
+    )
+
     def __init__(
         self,
         port_device: PortableDevice,
@@ -274,8 +623,11 @@ class PortableDeviceContent:  # pylint: disable=too-many-instance-attributes
         typ: int,
         size: int = 0,
         date_modified: int = 0,
+        dir_entry: "os.DirEntry[str] | None" = None,
+        stat_result: os.stat_result | None = None,
     ) -> None:
-        """Instance constructor"""
+        """Instance constructor. On gvfs size and date_modified come from stat_result if it is
+        given, otherwise from the stat of dir_entry, the os.scandir entry of the content."""
 
         self._port_device: PortableDevice = port_device
         self.full_filename: str = dirpath
@@ -283,25 +635,65 @@ class PortableDeviceContent:  # pylint: disable=too-many-instance-attributes
         self.storage_id: int = storage_id
         self.entry_id: int = entry_id
         self.content_type: int = typ
-        self.size: int = -1
-        self.date_modified: datetime.datetime = datetime.datetime.now()
+        self._size: int = -1
+        # modification time as timestamp, the datetime for date_modified is only created when used
+        self._mtime: float | None = None
+        # A stat on gvfs is a request to the device, so for gvfs files size and date_modified
+        # are read the first time they are used. Listings often only need the names.
+        self._stat_source: "os.DirEntry[str] | str | None" = None
         if typ == WPD_CONTENT_TYPE_FILE:
-            if _gvfs_found:
-                try:
-                    full_filename = os.path.join(_gvfs_search_path, port_device.device_start_part + dirpath)
-                    self.size = os.path.getsize(full_filename)
-                    self.date_modified = datetime.datetime.fromtimestamp(os.path.getmtime(full_filename))
-                except OSError:
-                    self.content_type = WPD_CONTENT_TYPE_STORAGE
+            if stat_result is not None:
+                self._size = stat_result.st_size
+                self._mtime = stat_result.st_mtime
+            elif _gvfs_found:
+                self._stat_source = (
+                    dir_entry
+                    if dir_entry is not None
+                    else port_device._gvfs_prefix + dirpath  # pyright: ignore[reportPrivateUsage]
+                )
             else:
-                self.size = size
-                self.date_modified = datetime.datetime.fromtimestamp(date_modified)
+                self._size = size
+                self._mtime = date_modified
         elif typ == WPD_CONTENT_TYPE_DEVICE:
             self.full_filename = port_device.devicename
 
-    def get_children(self) -> collections.abc.Generator["PortableDeviceContent", None, None]:
+    @property
+    def size(self) -> int:
+        """The size of the file in bytes, -1 for directories, storages and gvfs files that can't be stat'ed"""
+        if self._stat_source is not None:
+            self._read_stat()
+        return self._size
+
+    @property
+    def date_modified(self) -> datetime.datetime:
+        """The file modification date, 1970-01-01 for directories and storages"""
+        if self._stat_source is not None:
+            self._read_stat()
+        return _EPOCH if self._mtime is None else datetime.datetime.fromtimestamp(self._mtime)
+
+    def _read_stat(self) -> None:
+        """Read size and date_modified of a gvfs file. If the file can't be stat'ed, e.g. because
+        it was deleted after the listing, size stays -1 and date_modified 1970-01-01. The content
+        stays a WPD_CONTENT_TYPE_FILE: the type comes from the listing and callers have already
+        sorted the entry by it, so reading a size must not change it. Before the stat was done
+        lazily such files became WPD_CONTENT_TYPE_STORAGE."""
+        if (source := self._stat_source) is None:
+            return
+        self._stat_source = None
+        try:
+            stat: os.stat_result = os.stat(source) if isinstance(source, str) else source.stat()
+        except OSError:
+            return
+        self._size = stat.st_size
+        self._mtime = stat.st_mtime
+
+    def get_children(self, use_cache: bool = False) -> collections.abc.Generator["PortableDeviceContent", None, None]:
         """Get the child items (dirs and files) of a folder.
 
+        Parameters:
+            use_cache: If true the children are taken from the listing cache when the folder was read
+                    in the last LISTDIR_CACHE_TTL seconds.
+
         Returns:
             A Generator of PortableDeviceContent instances each representing a child entry.
 
@@ -317,51 +709,39 @@ class PortableDeviceContent:  # pylint: disable=too-many-instance-attributes
             >>> dev[0].close()
         """
         if _gvfs_found:
-            full_filename: str = os.path.join(
-                _gvfs_search_path, self._port_device.device_start_part + self.full_filename
-            )
-            if not os.path.isdir(full_filename):
-                return
-            for entry in os.listdir(full_filename):
-                full_name = os.path.join(self.full_filename, entry)
+            full_filename: str = self._port_device._gvfs_prefix + self.full_filename  # pyright: ignore[reportPrivateUsage]
+            for entry in _cached_scandir(full_filename, use_cache):
+                full_name = f"{self.full_filename}{os.sep}{entry.name}"
                 yield PortableDeviceContent(
                     port_device=self._port_device,
                     dirpath=full_name,
                     storage_id=1,
                     entry_id=0,
-                    typ=(
-                        WPD_CONTENT_TYPE_DIRECTORY
-                        if os.path.isdir(os.path.join(full_filename, entry))
-                        else WPD_CONTENT_TYPE_FILE
-                    ),
+                    typ=WPD_CONTENT_TYPE_DIRECTORY if entry.is_dir() else WPD_CONTENT_TYPE_FILE,
+                    dir_entry=entry,
                 )
         else:
             if _libmtp is None:
                 return
-            for entry in self._port_device.libmntp_device.get_files_and_folder(self.storage_id, self.entry_id):
-                type: Literal[1, 2] = (
-                    WPD_CONTENT_TYPE_DIRECTORY
-                    if entry.filetype == pylibmtp.LIBMTP_Filetype["FOLDER"].value  # pyright: ignore[reportAny]
-                    else WPD_CONTENT_TYPE_FILE
-                )
+            children, _ = _cached_mtp_children(self._port_device, self.storage_id, self.entry_id, use_cache)
+            for item_id, filename, filetype, filesize, modificationdate in children:
                 yield PortableDeviceContent(
                     port_device=self._port_device,
-                    dirpath=os.path.join(
-                        self.full_filename, entry.filename.decode("utf-8")  # pyright: ignore[reportAny]
-                    ),
+                    dirpath=f"{self.full_filename}{os.sep}{filename}",
                     storage_id=self.storage_id,
-                    entry_id=entry.item_id,  # pyright: ignore[reportAny]
-                    typ=type,
-                    size=entry.filesize,  # pyright: ignore[reportAny]
-                    date_modified=entry.modificationdate,  # pyright: ignore[reportAny]
+                    entry_id=item_id,
+                    typ=WPD_CONTENT_TYPE_DIRECTORY if filetype == _LIBMTP_FOLDER else WPD_CONTENT_TYPE_FILE,
+                    size=filesize,
+                    date_modified=modificationdate,
                 )
 
-    def get_child(self, name: str) -> "PortableDeviceContent | None":
+    def get_child(self, name: str, use_cache: bool = False) -> "PortableDeviceContent | None":
         """Returns a PortableDeviceContent for one child whos name is known.
         The search is case sensitive.
 
         Parameters:
             name: The name of the file or directory to search
+            use_cache: If true a libmtp folder listing read in the last LISTDIR_CACHE_TTL seconds is used
 
         Returns:
             The PortableDeviceContent instance of the child or None if the child could not be found.
@@ -378,46 +758,31 @@ class PortableDeviceContent:  # pylint: disable=too-many-instance-attributes
             >>> dev[0].close()
         """
         if _gvfs_found:
-            fullname = os.path.join(_gvfs_search_path, self._port_device.device_start_part + self.full_filename, name)
-            if not os.path.exists(fullname):
+            return _gvfs_content(self._port_device, f"{self.full_filename}{os.sep}{name}")
+        else:
+            if _libmtp is None:
+                return
+            _, by_name = _cached_mtp_children(self._port_device, self.storage_id, self.entry_id, use_cache)
+            if (child := by_name.get(name)) is None:
                 return None
+            item_id, filename, filetype, filesize, modificationdate = child
             return PortableDeviceContent(
                 self._port_device,
-                os.path.join(self.full_filename, name),
-                1,
-                1,
-                (WPD_CONTENT_TYPE_DIRECTORY if os.path.isdir(fullname) else WPD_CONTENT_TYPE_FILE),
+                f"{self.full_filename}{os.sep}{filename}",
+                self.storage_id,
+                item_id,
+                WPD_CONTENT_TYPE_DIRECTORY if filetype == _LIBMTP_FOLDER else WPD_CONTENT_TYPE_FILE,
+                filesize,
+                modificationdate,
             )
-        else:
-            if _libmtp is None:
-                return
-            for entry in self._port_device.libmntp_device.get_files_and_folder(self.storage_id, self.entry_id):
-                entry_filename = entry.filename.decode("UTF-8")  # pyright: ignore[reportAny]
-                if entry_filename != name:
-                    continue
-                # Ok found, so do a direct return
-                type: Literal[1, 2] = (
-                    WPD_CONTENT_TYPE_DIRECTORY
-                    if entry.filetype == pylibmtp.LIBMTP_Filetype["FOLDER"].value  # pyright: ignore[reportAny]
-                    else WPD_CONTENT_TYPE_FILE
-                )
-                return PortableDeviceContent(
-                    self._port_device,
-                    os.path.join(self.full_filename, entry_filename),  # pyright: ignore[reportAny]
-                    self.storage_id,
-                    entry.item_id,  # pyright: ignore[reportAny]
-                    type,
-                    entry.filesize,  # pyright: ignore[reportAny]
-                    entry.modificationdate,  # pyright: ignore[reportAny]
-                )
-            return None
 
-    def get_path(self, path: str) -> "PortableDeviceContent | None":
+    def get_path(self, path: str, use_cache: bool = False) -> "PortableDeviceContent | None":
         """Returns a PortableDeviceContent for a child who's path in the tree is known.
         The path can be fully qualified or starting from the current content.
 
         Parameters:
             path: The pathname to the child.
+            use_cache: If true libmtp folder listings read in the last LISTDIR_CACHE_TTL seconds are used
 
         Returns:
             The PortableDeviceContent instance of the child or None if the child could not be found.
@@ -435,35 +800,45 @@ class PortableDeviceContent:  # pylint: disable=too-many-instance-attributes
             'PortableDeviceContent DCIM (1)'
             >>> dev[0].close()
         """
-        path = path.replace("\\", os.path.sep)
-        start = path.split(os.sep, 1)[0]
+        if "\\" in path:
+            path = path.replace("\\", os.path.sep)
+        start, _, rest = path.partition(os.sep)
         if start == self._port_device.devicename:
             return get_content_from_device_path(self._port_device, path)
         if start == self.name:
-            path = path.split(os.sep, 1)[1]
+            if not rest:
+                return self
+            path = rest
         # Difference between gvfs and libmtp
         if _gvfs_found:
-            full_filename = os.path.join(
-                _gvfs_search_path,
-                self._port_device.device_start_part + self.full_filename,
-                path,
-            )
-            if not os.path.exists(full_filename):
-                return None
-            return PortableDeviceContent(
-                self._port_device,
-                os.path.join(self.full_filename, path),
-                1,
-                1,
-                (WPD_CONTENT_TYPE_DIRECTORY if os.path.isdir(full_filename) else WPD_CONTENT_TYPE_FILE),
-            )
+            return _gvfs_content(self._port_device, f"{self.full_filename}{os.sep}{path}")
         else:
-            cur: "PortableDeviceContent | None" = self
-            for part in path.split(os.path.sep):
-                if not cur:
-                    return None
-                cur = cur.get_child(part)
-            return cur
+            return self._get_mtp_descendant(path.split(os.path.sep), use_cache)
+
+    def _get_mtp_descendant(self, parts: list[str], use_cache: bool = False) -> "PortableDeviceContent | None":
+        """Find the libmtp content parts below this content. Only the folder listings are used on
+        the way, a PortableDeviceContent is only created for the content found."""
+        entry_id = self.entry_id
+        child: _MtpChild | None = None
+        for part in parts:
+            if child is not None and child[2] != _LIBMTP_FOLDER:
+                return None
+            _, by_name = _cached_mtp_children(self._port_device, self.storage_id, entry_id, use_cache)
+            if (child := by_name.get(part)) is None:
+                return None
+            entry_id = child[0]
+        if child is None:
+            return self
+        item_id, _, filetype, filesize, modificationdate = child
+        return PortableDeviceContent(
+            self._port_device,
+            os.sep.join([self.full_filename, *parts]),
+            self.storage_id,
+            item_id,
+            WPD_CONTENT_TYPE_DIRECTORY if filetype == _LIBMTP_FOLDER else WPD_CONTENT_TYPE_FILE,
+            filesize,
+            modificationdate,
+        )
 
     @override
     def __repr__(self) -> str:
@@ -495,14 +870,18 @@ class PortableDeviceContent:  # pylint: disable=too-many-instance-attributes
         """
         fullname = os.path.join(self.full_filename, dirname)
         if _gvfs_found:
-            full_filename = os.path.join(_gvfs_search_path, self._port_device.device_start_part + fullname)
-            if os.path.exists(full_filename):
-                raise IOError(f"Directory '{fullname}' allready exists")
-            os.mkdir(full_filename)
+            full_filename = self._port_device._gvfs_prefix + fullname  # pyright: ignore[reportPrivateUsage]
+            try:
+                os.mkdir(full_filename)
+            except FileExistsError as err:
+                raise IOError(f"Directory '{fullname}' allready exists") from err
+            _forget_listing(full_filename)
             pdc = PortableDeviceContent(self._port_device, fullname, 0, 0, WPD_CONTENT_TYPE_DIRECTORY)
         else:
             try:
-                id = self._port_device.libmntp_device.create_folder(dirname, self.entry_id, self.storage_id)
+                with self._port_device._transfer_lock:  # pyright: ignore[reportPrivateUsage]
+                    id = self._port_device.libmntp_device.create_folder(dirname, self.entry_id, self.storage_id)
+                _forget_mtp_listings(self._port_device, (self.storage_id, self.entry_id))
                 pdc = PortableDeviceContent(
                     self._port_device, fullname, self.storage_id, id, WPD_CONTENT_TYPE_DIRECTORY
                 )
@@ -510,12 +889,14 @@ class PortableDeviceContent:  # pylint: disable=too-many-instance-attributes
                 raise IOError(f"Error creating directory '{fullname}'")
         return pdc
 
-    def upload_file(self, filename: str, inputfilename: str) -> None:
+    def upload_file(self, filename: str, inputfilename: str, *, skip_if_same: bool = False) -> None:
         """Upload of a file to MTP device.
 
         Parameters:
             filename: Name of the new file on the MTP device
             inputfilename: Name of the file that shall be uploaded
+            skip_if_same: If True the upload is skipped when the file on the MTP device has the
+                          same size and isn't older than inputfilename (see files_to_upload)
 
         Exceptions:
             IOError: If something went wrong
@@ -535,32 +916,85 @@ class PortableDeviceContent:  # pylint: disable=too-many-instance-attributes
             'PortableDeviceContent test.jpg (2)'
             >>> dev[0].close()
         """
+        self.upload_files([(filename, inputfilename)], skip_if_same=skip_if_same)
+
+    def upload_files(self, files: list[tuple[str, str]], *, skip_if_same: bool = False) -> None:
+        """Upload of several files into this directory of the MTP device.
+        The directory path is only resolved once for all files.
+
+        Parameters:
+            files: Tuples with the name of the new file on the MTP device and the name
+                   of the file that shall be uploaded, like for upload_file
+            skip_if_same: Like for upload_file
+
+        Exceptions:
+            IOError: If something went wrong
+        """
+        if skip_if_same:
+            files = self.files_to_upload(files)
         if _gvfs_found:
-            full_filename = os.path.join(
-                _gvfs_search_path,
-                self._port_device.device_start_part + self.full_filename,
-                filename,
-            )
-            try:
-                _ = shutil.copyfile(inputfilename, full_filename)
-            except OSError:
-                # Ok can't copy with shutil on older Gnomes (for example Zorin). si we use gio
-                gio_full_filename = "mtp://" + full_filename.split("=", 1)[1]
+            dirname = self._port_device._gvfs_prefix + self.full_filename  # pyright: ignore[reportPrivateUsage]
+            _forget_listing(dirname)
+            for filename, inputfilename in files:
+                full_filename = os.path.join(dirname, filename)
                 try:
-                    _ = subprocess.check_output(
-                        f'gio copy "{inputfilename}" "{gio_full_filename}"',
-                        shell=True,
-                        stderr=subprocess.STDOUT,
-                    )
-                except subprocess.CalledProcessError as err:
-                    raise IOError(
-                        f"Error copying file '{inputfilename}' to '{gio_full_filename}': {urllib.parse.unquote(err.output.decode('utf-8'))}"  # pyright: ignore[reportAny]
-                    ) from err
-            # shutil.copy(inputfilename, full_filename)
+                    _fast_copy(inputfilename, full_filename)
+                except OSError:
+                    # Ok can't copy with shutil on older Gnomes (for example Zorin). si we use gio
+                    gio_full_filename = "mtp://" + full_filename.split("=", 1)[1]
+                    try:
+                        _ = subprocess.check_output(
+                            f'gio copy "{inputfilename}" "{gio_full_filename}"',
+                            shell=True,
+                            stderr=subprocess.STDOUT,
+                        )
+                    except subprocess.CalledProcessError as err:
+                        raise IOError(
+                            f"Error copying file '{inputfilename}' to '{gio_full_filename}': {urllib.parse.unquote(err.output.decode('utf-8'))}"  # pyright: ignore[reportAny]
+                        ) from err
         else:
-            _ = self._port_device.libmntp_device.send_file_from_file(
-                inputfilename, filename, self.storage_id, self.entry_id
-            )
+            device = self._port_device.libmntp_device
+            try:
+                # libmtp reads every file while it sends it, the next file is read ahead meanwhile
+                if files:
+                    _prefetch_file(files[0][1])
+                for index, (filename, inputfilename) in enumerate(files):
+                    if index + 1 < len(files):
+                        _prefetch_file(files[index + 1][1])
+                    with self._port_device._transfer_lock:  # pyright: ignore[reportPrivateUsage]
+                        _ = device.send_file_from_file(inputfilename, filename, self.storage_id, self.entry_id)
+            finally:
+                _forget_mtp_listings(self._port_device, (self.storage_id, self.entry_id))
+
+    def files_to_upload(self, files: list[tuple[str, str]]) -> list[tuple[str, str]]:
+        """Filter the files that are already on the MTP device.
+        A file counts as already uploaded if a file with that name exists in this directory, has
+        the same size and its modification date isn't older than the local file. The dates can't
+        be compared for equality because the MTP device sets the date of the upload.
+
+        Parameters:
+            files: Tuples with the name of the file on the MTP device and the local file name,
+                   like for upload_files
+
+        Returns:
+            The tuples of the files that need to be uploaded
+
+        Exceptions:
+            IOError: If something went wrong
+        """
+        remote_files: dict[str, PortableDeviceContent] = {
+            child.name: child for child in self.get_children() if child.content_type == WPD_CONTENT_TYPE_FILE
+        }
+        changed: list[tuple[str, str]] = []
+        for filename, inputfilename in files:
+            remote = remote_files.get(filename)
+            if remote is not None:
+                stat = os.stat(inputfilename)
+                # 2 seconds tolerance for filesystems with a coarse time resolution
+                if remote.size == stat.st_size and remote.date_modified.timestamp() >= stat.st_mtime - 2:
+                    continue
+            changed.append((filename, inputfilename))
+        return changed
 
     def download_file(self, outputfilename: str) -> None:
         """Download of a file from MTP device
@@ -584,10 +1018,48 @@ class PortableDeviceContent:  # pylint: disable=too-many-instance-attributes
             >>> dev[0].close()
         """
         if _gvfs_found:
-            full_filename = os.path.join(_gvfs_search_path, self._port_device.device_start_part + self.full_filename)
-            _ = shutil.copy2(full_filename, outputfilename)
+            full_filename = self._port_device._gvfs_prefix + self.full_filename  # pyright: ignore[reportPrivateUsage]
+            _fast_copy(full_filename, outputfilename)
+            shutil.copystat(full_filename, outputfilename)
+        else:
+            with self._port_device._transfer_lock:  # pyright: ignore[reportPrivateUsage]
+                self._port_device.libmntp_device.get_file_to_file(self.entry_id, outputfilename)
+
+    def download_files(self, files: list[tuple[str, str]]) -> None:
+        """Download of several files from this directory of the MTP device.
+        On gvfs the files are copied in parallel, so the latency of one file overlaps with the
+        transfer of the others.
+
+        Parameters:
+            files: Tuples with the name of the file in this directory and the name of the file
+                   it shall be written to, like for download_file
+
+        Exceptions:
+            IOError: If something went wrong
+        """
+        if _gvfs_found:
+            dirname = self._port_device._gvfs_prefix + self.full_filename  # pyright: ignore[reportPrivateUsage]
+
+            def download(file: tuple[str, str]) -> None:
+                full_filename = f"{dirname}{os.sep}{file[0]}"
+                _fast_copy(full_filename, file[1])
+                shutil.copystat(full_filename, file[1])
+
+            if len(files) <= 1:
+                for file in files:
+                    download(file)
+                return
+            with ThreadPoolExecutor(max_workers=min(4, len(files))) as executor:
+                for _ in executor.map(download, files):
+                    pass
         else:
-            self._port_device.libmntp_device.get_file_to_file(self.entry_id, outputfilename)
+            _, by_name = _cached_mtp_children(self._port_device, self.storage_id, self.entry_id, False)
+            device = self._port_device.libmntp_device
+            for filename, outputfilename in files:
+                if (child := by_name.get(filename)) is None:
+                    raise IOError(f"File '{self.full_filename}{os.sep}{filename}' not found")
+                with self._port_device._transfer_lock:  # pyright: ignore[reportPrivateUsage]
+                    device.get_file_to_file(child[0], outputfilename)
 
     def remove(self) -> None:
         """Deletes the current directory or file.
@@ -611,15 +1083,20 @@ class PortableDeviceContent:  # pylint: disable=too-many-instance-attributes
             >>> dev[0].close()
         """
         if _gvfs_found:
-            full_name = os.path.join(_gvfs_search_path, self._port_device.device_start_part + self.full_filename)
-            if not os.path.exists(full_name):
+            full_name = self._port_device._gvfs_prefix + self.full_filename  # pyright: ignore[reportPrivateUsage]
+            _forget_listing(full_name)
+            try:
+                if self.content_type == WPD_CONTENT_TYPE_FILE:
+                    os.remove(full_name)
+                else:
+                    shutil.rmtree(full_name)
+            except FileNotFoundError:
                 return
-            if self.content_type == WPD_CONTENT_TYPE_FILE:
-                os.remove(full_name)
-            else:
-                shutil.rmtree(full_name)
         else:
-            self._port_device.libmntp_device.delete_object(self.entry_id)
+            with self._port_device._transfer_lock:  # pyright: ignore[reportPrivateUsage]
+                self._port_device.libmntp_device.delete_object(self.entry_id)
+            # the folder of this content isn't known, so all listings of the device are read again
+            _forget_mtp_listings(self._port_device)
 
 
 # -------------------------------------------------------------------------------------------------
@@ -644,27 +1121,44 @@ def get_portable_devices() -> list[PortableDevice]:
         >>> devs[0].close()
     """
     global _gvfs_found
-    devices: list[PortableDevice] = []
-    if not os.path.exists(_gvfs_search_path):
+    entries: list["str | ctypes._Pointer[pylibmtp.LIBMTP_RawDevice]"]  # pyright: ignore[reportPrivateUsage]
+    # Opening the directory is the check for gvfs, a separate exists would be one more stat
+    try:
+        gvfs_dir = os.scandir(_gvfs_search_path)
+    except FileNotFoundError:
+        gvfs_dir = None
+    if gvfs_dir is None:
         # We assume, we are not on a GNOME system with installed gvfs
         # So we try to use libmtp
         if _libmtp is None:
             _init_libmtp()
         if _libmtp is None:
             raise OSError("Can't init libmtp")
-        for entry in _libmtp.detect_devices():  # type: ignore
-            dev = PortableDevice(entry)
-            # Device is not ready if we don't get a content
-            if len(dev.get_content()) != 0:
-                devices.append(dev)
+        entries = list(_detect_raw_devices())
     else:
         _gvfs_found = True
-        for entry in os.scandir(_gvfs_search_path):
-            dev = PortableDevice(entry.name)
-            # Device is not ready if we don't get a content
-            if len(dev.get_content()) != 0:
-                devices.append(dev)
-    return devices
+        with gvfs_dir:
+            entries = [entry.name for entry in gvfs_dir]
+    if len(entries) <= 1 or not _gvfs_found:
+        # libmtp devices can't be opened in parallel
+        probed = [_probe_device(entry) for entry in entries]
+    else:
+        # Every gvfs mount is independent, so they are opened in parallel
+        with ThreadPoolExecutor(max_workers=min(8, len(entries))) as executor:
+            probed = list(executor.map(_probe_device, entries))
+    return [dev for dev in probed if dev is not None]
+
+
+def _probe_device(
+    entry: "str | ctypes._Pointer[pylibmtp.LIBMTP_RawDevice]",  # pyright: ignore[reportPrivateUsage]
+) -> PortableDevice | None:
+    """Open a device found by get_portable_devices, None if the device isn't ready"""
+    dev = PortableDevice(entry)
+    # Device is not ready if we don't get a content, else the storages are kept for the first get_content
+    if storages := dev.get_content():
+        dev._probed_storages = storages  # pyright: ignore[reportPrivateUsage]
+        return dev
+    return None
 
 
 def get_content_from_device_path(dev: PortableDevice, fpath: str) -> PortableDeviceContent | None:
@@ -693,37 +1187,33 @@ def get_content_from_device_path(dev: PortableDevice, fpath: str) -> PortableDev
         'PortableDeviceContent Camera (1)'
         >>> dev[0].close()
     """
-    fpath = fpath.replace("\\", os.path.sep)
+    if "\\" in fpath:
+        fpath = fpath.replace("\\", os.path.sep)
     if fpath == dev.devicename:
         raise IOError("get_content_from_device_path needs a devicename and a storage as paramter")
     if _gvfs_found:
-        full_fpath = os.path.join(_gvfs_search_path, dev.device_start_part + fpath)
-        if not os.path.exists(full_fpath):
-            return None
-        content_type = WPD_CONTENT_TYPE_DIRECTORY if os.path.isdir(full_fpath) else WPD_CONTENT_TYPE_FILE
-        return PortableDeviceContent(
-            dev,
-            fpath,
-            1,
-            1,
-            content_type,
-        )
+        return _gvfs_content(dev, fpath)
     else:
         parts = fpath.split(os.sep)
         storname_to_search = os.path.join(parts[0], parts[1])
-        found_stor = None
-        for stor in dev.get_content():
-            if stor.full_filename == storname_to_search:
-                found_stor = stor
-                break
-        if found_stor is None:
-            raise IOError(f"The storage {storname_to_search} could not be found")
-        cont = found_stor
-        for pp in parts[2:]:
-            cont = cont.get_child(pp)
-            if cont is None:
-                return None
-        return cont
+        return _find_storage(dev, storname_to_search)._get_mtp_descendant(parts[2:])  # pyright: ignore[reportPrivateUsage]
+
+
+def _find_storage(dev: PortableDevice, storname: str) -> PortableDeviceContent:
+    """Get the libmtp storage with the full_filename storname. The storages are read from the
+    device again if the name isn't known, it may be new."""
+    found_stor = (dev._storages_by_name or {}).get(storname)  # pyright: ignore[reportPrivateUsage]
+    if found_stor is None:
+        _ = dev.get_content()
+        found_stor = (dev._storages_by_name or {}).get(storname)  # pyright: ignore[reportPrivateUsage]
+    if found_stor is None:
+        raise IOError(f"The storage {storname} could not be found")
+    return found_stor
+
+
+def _list_children(cont: PortableDeviceContent, use_cache: bool) -> list[PortableDeviceContent]:
+    """Read all children of cont, used by walk to list directories in advance"""
+    return list(cont.get_children(use_cache))
 
 
 def walk(
@@ -731,6 +1221,10 @@ def walk(
     path: str,
     callback: Callable[[str], bool] | None = None,
     error_callback: Callable[[str], bool] | None = None,
+    *,
+    prefetch: int = 0,
+    sort: bool = True,
+    use_cache: bool = True,
 ) -> collections.abc.Generator[tuple[str, list[PortableDeviceContent], list[PortableDeviceContent]], None, None]:
     """Iterates ower all files in a tree just like os.walk
 
@@ -744,6 +1238,13 @@ def walk(
         error_callback: When given, a function that takes one argument (the errormessage) and returns
                 a boolean. If the returned value is false, walk will cancel and return empty
                 list.
+        prefetch: Number of directories that are listed in background threads while the caller
+                works on the current one, e.g. 4. 0, the default, lists every directory only when
+                it is reached, so nothing is read from the device that the caller doesn't ask for.
+        sort: If false the directories and files are returned in the order the device lists
+                them, faster for callers that don't need them sorted.
+        use_cache: If false all directories are read from the device even if they were read in the
+                last LISTDIR_CACHE_TTL seconds.
 
     Returns:
         A tuple with this content:
@@ -772,41 +1273,143 @@ def walk(
         test.jpg
         >>> dev[0].close()
     """
-    path = path.replace("\\", os.path.sep)
+    if "\\" in path:
+        path = path.replace("\\", os.path.sep)
     if (cont := get_content_from_device_path(dev, path)) is None:
         return
-    walk_cont: list[PortableDeviceContent] = [cont]
-    while walk_cont:
-        cont = walk_cont[0]
-        del walk_cont[0]
-        directories: list[PortableDeviceContent] = []
-        files: list[PortableDeviceContent] = []
-        try:
-            for child in cont.get_children():
-                contenttype = child.content_type
-                if contenttype in [
-                    WPD_CONTENT_TYPE_STORAGE,
-                    WPD_CONTENT_TYPE_DIRECTORY,
-                ]:
-                    directories.append(child)
-                elif contenttype == WPD_CONTENT_TYPE_FILE:
-                    files.append(child)
-                if callback and not callback(child.full_filename):
-                    directories = []
-                    files = []
-                    return
-            directories.sort(key=lambda ent: ent.full_filename)
-            files.sort(key=lambda ent: ent.full_filename)
-            yield cont.full_filename, directories, files
-        except Exception as err:
-            if error_callback is not None:
-                if not error_callback(str(err)):
-                    directories = []
-                    files = []
-                    return
-            else:
-                raise IOError from err
-        walk_cont.extend(directories)
+    walk_cont: collections.deque[PortableDeviceContent] = collections.deque([cont])
+    # listings of the first directories in walk_cont, read in advance by the executor
+    listings: collections.deque[Future[list[PortableDeviceContent]]] = collections.deque()
+    executor = ThreadPoolExecutor(max_workers=prefetch) if prefetch > 0 else None
+    try:
+        while walk_cont:
+            if executor is not None:
+                while len(listings) < min(prefetch, len(walk_cont)):
+                    listings.append(executor.submit(_list_children, walk_cont[len(listings)], use_cache))
+            cont = walk_cont.popleft()
+            directories: list[PortableDeviceContent] = []
+            files: list[PortableDeviceContent] = []
+            try:
+                for child in listings.popleft().result() if listings else cont.get_children(use_cache):
+                    if callback and not callback(child.full_filename):
+                        return
+                    contenttype = child.content_type
+                    if contenttype in _DIR_TYPES:
+                        directories.append(child)
+                    elif contenttype == WPD_CONTENT_TYPE_FILE:
+                        files.append(child)
+                if sort:
+                    directories.sort(key=_BY_PATH)
+                    files.sort(key=_BY_PATH)
+                yield cont.full_filename, directories, files
+            except Exception as err:
+                if error_callback is not None:
+                    if not error_callback(str(err)):
+                        return
+                else:
+                    raise IOError from err
+            walk_cont.extend(directories)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def flat_walk(
+    dev: PortableDevice, path: str, *, use_cache: bool = True
+) -> tuple[list[str], list[int], list[int], list[float]]:
+    """Lists all directories and files in a tree without creating a PortableDeviceContent for
+    each of them. Faster than walk for callers that only need the names and properties.
+
+    Parameters:
+        dev: Portable device to iterate in
+        path: path from witch to iterate
+        use_cache: If false all directories are read from the device even if they were read in the
+                last LISTDIR_CACHE_TTL seconds.
+
+    Returns:
+        A tuple of four lists with one element for every directory and file below path, in the
+        order the device lists them:
+
+            - The full names, like PortableDeviceContent.full_filename
+            - The sizes in bytes, -1 for directories
+            - The content types, WPD_CONTENT_TYPE_DIRECTORY or WPD_CONTENT_TYPE_FILE
+            - The modification dates as timestamps, 0.0 for directories
+
+    Exceptions:
+        IOError: If something went wrong
+
+    Examples:
+        >>> import mtp.linux_access
+        >>> dev = mtp.linux_access.get_portable_devices()
+        >>> names, sizes, types, dates = mtp.linux_access.flat_walk(dev[0], dev[0].devicename)
+        >>> dev[0].close()
+    """
+    names: list[str] = []
+    sizes: list[int] = []
+    types: list[int] = []
+    dates: list[float] = []
+    if "\\" in path:
+        path = path.replace("\\", os.path.sep)
+    if (cont := get_content_from_device_path(dev, path)) is None:
+        return names, sizes, types, dates
+    try:
+        if _gvfs_found:
+            gvfs_dirs = collections.deque(
+                [(cont.full_filename, dev._gvfs_prefix + cont.full_filename)]  # pyright: ignore[reportPrivateUsage]
+            )
+            while gvfs_dirs:
+                dirname, gvfs_dirname = gvfs_dirs.popleft()
+                for entry in _cached_scandir(gvfs_dirname, use_cache):
+                    name = f"{dirname}{os.sep}{entry.name}"
+                    if entry.is_dir():
+                        gvfs_dirs.append((name, entry.path))
+                        names.append(name)
+                        sizes.append(-1)
+                        types.append(WPD_CONTENT_TYPE_DIRECTORY)
+                        dates.append(0.0)
+                    else:
+                        stat = entry.stat()
+                        names.append(name)
+                        sizes.append(stat.st_size)
+                        types.append(WPD_CONTENT_TYPE_FILE)
+                        dates.append(stat.st_mtime)
+        elif _libmtp is not None:
+            mtp_dirs = collections.deque([(cont.full_filename, cont.entry_id)])
+            while mtp_dirs:
+                dirname, entry_id = mtp_dirs.popleft()
+                children, _ = _cached_mtp_children(dev, cont.storage_id, entry_id, use_cache)
+                for item_id, filename, filetype, filesize, modificationdate in children:
+                    name = f"{dirname}{os.sep}{filename}"
+                    if filetype == _LIBMTP_FOLDER:
+                        mtp_dirs.append((name, item_id))
+                        names.append(name)
+                        sizes.append(-1)
+                        types.append(WPD_CONTENT_TYPE_DIRECTORY)
+                        dates.append(0.0)
+                    else:
+                        names.append(name)
+                        sizes.append(filesize)
+                        types.append(WPD_CONTENT_TYPE_FILE)
+                        dates.append(float(modificationdate))
+    except Exception as err:
+        raise IOError(f"Error reading '{path}'") from err
+    return names, sizes, types, dates
+
+
+def invalidate_device_cache() -> None:
+    """Forget the MTP devices detected by libmtp, the next get_portable_devices detects them again.
+    Plugging a USB device in or out already does this automatically."""
+    global _raw_devices_cache
+    _raw_devices_cache = None
+
+
+def clear_cache() -> None:
+    """Forget all cached directory listings of gvfs mounted devices and libmtp folders.
+    Needed if the content of a device was changed by another program before LISTDIR_CACHE_TTL
+    seconds are over."""
+    with _listdir_lock:
+        _listdir_cache.clear()
+        _mtp_listing_cache.clear()
 
 
 def makedirs(dev: PortableDevice, create_path: str) -> PortableDeviceContent:
@@ -836,30 +1439,27 @@ def makedirs(dev: PortableDevice, create_path: str) -> PortableDeviceContent:
         >>> cont.remove()
         >>> dev[0].close()
     """
-    path: str = create_path.replace("\\", os.path.sep)
+    path: str = create_path.replace("\\", os.path.sep) if "\\" in create_path else create_path
     if _gvfs_found:
         try:
-            fullpath = os.path.join(_gvfs_search_path, dev.device_start_part + path)
-            if not os.path.exists(fullpath):
-                os.makedirs(fullpath, exist_ok=True)
+            fullpath = dev._gvfs_prefix + path  # pyright: ignore[reportPrivateUsage]
+            try:
+                os.makedirs(fullpath)
+            except FileExistsError:
+                pass
+            else:
+                _forget_listing(fullpath)
             cont = get_content_from_device_path(dev, path)
         except (IOError, IndexError) as err:
             raise IOError(f"Error creating directory '{path}': {err.args[1]}") from err
         if cont is None:
             raise IOError(f"Error creating directory '{path}'")
     else:
-        found_stor = None
         parts = path.split(os.sep)
         if len(parts) <= 2:
             raise IOError(f"Devicename and or storage are missing in  {path}")
-        storname_to_search = os.path.join(parts[0], parts[1])
-        for stor in dev.get_content():
-            if stor.full_filename == storname_to_search:
-                found_stor = stor
-                break
-        if found_stor is None:
-            raise IOError(f"The storage {storname_to_search} could not be found")
-        cont = found_stor
+        cont = _find_storage(dev, os.path.join(parts[0], parts[1]))
+        # get_child finds the parts in the cached listings by name
         for pp in parts[2:]:
             par_cont = cont
             cont = cont.get_child(pp)
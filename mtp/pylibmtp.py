@@ -405,6 +405,8 @@ _libmtp.LIBMTP_Get_Files_And_Folders.argtypes = [
     ctypes.c_uint32,
     ctypes.c_uint32,
 ]
+_libmtp.LIBMTP_destroy_file_t.restype = None
+_libmtp.LIBMTP_destroy_file_t.argtypes = [ctypes.POINTER(LIBMTP_File)]
 _libmtp.LIBMTP_Get_Tracklisting_With_Callback.restype = ctypes.POINTER(LIBMTP_Track)
 _libmtp.LIBMTP_Get_Filetype_Description.restype = ctypes.c_char_p
 _libmtp.LIBMTP_Get_Filemetadata.restype = ctypes.POINTER(LIBMTP_File)
@@ -707,6 +709,34 @@ class MTP:
             next = next.contents.next
         return ret
 
+    def get_children_with_props(self, storage_id: int, parent_id: int) -> list[tuple[int, str, int, int, int]]:
+        """
+        Get the files and folders of folder parent_id on a storage with all their metadata in one
+        LIBMTP_Get_Files_And_Folders call (which uses GetObjectPropList when the device supports it).
+        The values are copied and the list returned by libmtp is freed.
+
+                @rtype: list
+                @return: Tuples with item_id, filename, filetype, filesize and modificationdate
+        """
+        ret: list[tuple[int, str, int, int, int]] = []
+        if self.device is None:
+            raise NotConnected
+        next = self.mtp.LIBMTP_Get_Files_And_Folders(self.device, storage_id, parent_id)
+        while next:
+            entry = next.contents
+            ret.append(
+                (
+                    entry.item_id,
+                    (entry.filename or b"").decode("utf-8"),
+                    entry.filetype,
+                    entry.filesize,
+                    entry.modificationdate,
+                )
+            )
+            current, next = next, entry.next
+            self.mtp.LIBMTP_destroy_file_t(current)
+        return ret
+
     def get_storage(self) -> list[tuple[str, int]]:
         """
         This function updates all the storage id's of a device and their properties, then creates a linked list
@@ -24,6 +24,7 @@ The module contains the following functions:
     PortableDeviceContent
 - 'walk' - Iterates ower all files in a tree.
 - 'makedirs' - Creates the directories on the MTP device if they don't exist.
+- 'clear_cache' - Forget the cached directory listings.
 
 The module contains the following classes:
 
@@ -51,14 +52,18 @@ Examples:
 
 # pyright: basic
 
+import collections
 import collections.abc
 import ctypes
 import datetime
 import io
+from operator import attrgetter
 import os
 import os.path
+import time
 from typing import Any, IO, Callable
 import contextlib
+import copy
 import comtypes
 import comtypes.client
 import comtypes.automation
@@ -144,10 +149,35 @@ WPD_CONTENT_TYPE_DEVICE = 3
 WPD_DELETE_NO_RECURSION = 0
 WPD_DELETE_WITH_RECURSION = 1
 
+# Content types walk descends into and sort key for walk
+_DIR_TYPES = frozenset({WPD_CONTENT_TYPE_STORAGE, WPD_CONTENT_TYPE_DIRECTORY})
+_BY_PATH = attrgetter("full_filename")
+
+# Children read by get_children are kept for LISTDIR_CACHE_TTL seconds, the key is (device,
+# object id of the folder). The least recently used entries are removed when there are more than
+# LISTDIR_CACHE_SIZE. Changes done with this module remove the affected entries.
+# Only walk uses it by default, the other functions read the device unless they get
+# use_cache=True, so changes done by other programs are seen at once.
+LISTDIR_CACHE_SIZE = 4096
+LISTDIR_CACHE_TTL = 5.0
+_listdir_cache: collections.OrderedDict[
+    tuple["PortableDevice", Any], tuple[float, list["PortableDeviceContent"]]
+] = collections.OrderedDict()
+
 # Module variables
 DEVICE_MANAGER: Any | None = None
 
 
+def _forget_listings(dev: "PortableDevice", object_id: Any = None) -> None:
+    """Remove the cached children of the folder object_id, or all cached listings of dev if no
+    object_id is given"""
+    if object_id is not None:
+        _ = _listdir_cache.pop((dev, object_id), None)
+        return
+    for key in [key for key in _listdir_cache if key[0] is dev]:
+        del _listdir_cache[key]
+
+
 # -------------------------------------------------------------------------------------------------
 class PortableDeviceContent:
     """Class for one file, directory or storage with it's properties.
@@ -288,9 +318,21 @@ class PortableDeviceContent:
         propvalues.Clear()
         self.full_filename = os.path.join(self._parent_path, self._plain_name)
 
-    def get_children(self) -> collections.abc.Generator["PortableDeviceContent", None, None]:
+    def _copy_below(self, parent_path: str) -> "PortableDeviceContent":
+        """A copy of this content with full_filename built from parent_path, used for cached
+        children that are found again through another path of the parent."""
+        content = copy.copy(self)
+        content._parent_path = parent_path
+        content.full_filename = os.path.join(parent_path, self._plain_name)
+        return content
+
+    def get_children(self, use_cache: bool = False) -> collections.abc.Generator["PortableDeviceContent", None, None]:
         """Get the child items (dirs and files) of a folder.
 
+        Parameters:
+            use_cache: if true the children are taken from the listing cache when the folder was
+                    read in the last LISTDIR_CACHE_TTL seconds.
+
         Returns:
             A Generator of PortableDeviceContent instances each representing a child entry.
 
@@ -305,6 +347,14 @@ class PortableDeviceContent:
             'PortableDeviceContent Pictures (1)'
             >>> dev[0].close()
         """
+        key = (self._port_device, self._object_id)
+        now = time.monotonic()
+        if use_cache and (cached := _listdir_cache.get(key)) is not None and now - cached[0] < LISTDIR_CACHE_TTL:
+            _listdir_cache.move_to_end(key)
+            for child in cached[1]:
+                yield child._copy_below(self.full_filename)
+            return
+        children: list[PortableDeviceContent] = []
         try:
             enumobject_ids = self._content.EnumObjects(  # pyright: ignore[reportAttributeAccessIssue]
                 ctypes.c_ulong(0),
@@ -324,9 +374,16 @@ class PortableDeviceContent:
                 value = PortableDeviceContent(
                     curobject_id, self._content, self._port_device, self._properties, self.full_filename
                 )
+                # The cache keeps its own copy, callers may change full_filename of what they get
+                children.append(copy.copy(value))
                 yield value
         except comtypes.COMError as err:
             raise IOError(f"Error getting child item from '{self.full_filename}': {err.args[1]}")
+        # Only complete listings are kept
+        _listdir_cache[key] = (now, children)
+        _listdir_cache.move_to_end(key)
+        while len(_listdir_cache) > LISTDIR_CACHE_SIZE:
+            _ = _listdir_cache.popitem(last=False)
 
     def get_child(self, name: str) -> "PortableDeviceContent | None":
         """Returns a PortableDeviceContent for one child whos name is known.
@@ -429,6 +486,7 @@ class PortableDeviceContent:
             self._content.CreateObjectWithPropertiesOnly(  # pyright: ignore[reportAttributeAccessIssue]
                 object_properties, ctypes.POINTER(ctypes.c_wchar_p)()
             )
+            _forget_listings(self._port_device, self._object_id)
             pdc = self.get_child(dirname)
         except comtypes.COMError as err:
             raise IOError(f"Error creating directory '{dirname}': {err.args[1]}")
@@ -475,6 +533,7 @@ class PortableDeviceContent:
                     len(block),
                 )
             filestream.Commit(0)
+            _forget_listings(self._port_device, self._object_id)
         except comtypes.COMError as err:
             raise IOError(f"Error storing stream '{filename}': {err.args[1]}")
         finally:
@@ -608,6 +667,8 @@ class PortableDeviceContent:
             self._content.Delete(  # pyright: ignore[reportAttributeAccessIssue]
                 WPD_DELETE_WITH_RECURSION, objects_to_delete, ctypes.pointer(errors)
             )
+            # The parent isn't known and the listings below a directory are gone too
+            _forget_listings(self._port_device)
         except comtypes.COMError as err:
             raise IOError(f"Error deleting directory/file '{self.full_filename}': {err.args[1]}")
         finally:
@@ -650,6 +711,8 @@ class PortableDevice:
         self.name, self.description = self._get_description()
         # Get the serialnumber
         self._pdc = PortableDeviceContent(ctypes.c_wchar_p("DEVICE"), self._device.Content(), self, None)
+        # The storages by name from the last get_content, used to resolve paths
+        self._storages_by_name: dict[str, PortableDeviceContent] | None = None
         self.serialnumber = self._pdc._serialnumber
         self.devicename = f"{self.name}_{self.description}_{self.serialnumber}"
         # Correct filename because during the initialisation it's only filled
@@ -657,8 +720,11 @@ class PortableDevice:
         self._pdc.full_filename = self.devicename
 
     def close(self) -> None:
-        """Close the connection to the device. This must be called when the device is no more needed."""
-        comtypes.CoUninitialize()
+        """Close the connection to the device. This must be called when the device is no more needed.
+        COM itself stays initialised, so devices can be fetched again in the same process."""
+        _forget_listings(self)
+        self._storages_by_name = None
+        self._device.Close()
 
     def _get_description(self) -> tuple[str, str]:
         """Get the name and the description of the device. If no description is available
@@ -727,7 +793,12 @@ class PortableDevice:
             'PortableDeviceContent Interner gemeinsamer Speicher (0)'
             >>> dev[0].close()
         """
-        return list(self._pdc.get_children())
+        # Not cached, the free space of the storages changes with every upload
+        storages = list(self._pdc.get_children())
+        self._storages_by_name = {}
+        for storage in storages:
+            _ = self._storages_by_name.setdefault(storage.name, storage)
+        return storages
 
     def __repr__(self) -> str:
         return f"PortableDevice: {self.serialnumber} ({self.name})"
@@ -806,11 +877,7 @@ def get_content_from_device_path(dev: PortableDevice, path: str) -> PortableDevi
         raise IOError("get_content_from_device_path needs a devicename and a storage as paramter")
     if path_parts[0] == dev.devicename:
         try:
-            cont: PortableDeviceContent | None = None
-            for entry in dev.get_content():
-                if entry.name == path_parts[1]:
-                    cont = entry
-                    break
+            cont: PortableDeviceContent | None = _find_storage(dev, path_parts[1])
             if cont is None:
                 return None
             for part in path_parts[2:]:
@@ -823,11 +890,24 @@ def get_content_from_device_path(dev: PortableDevice, path: str) -> PortableDevi
     return None
 
 
+def _find_storage(dev: PortableDevice, storname: str) -> PortableDeviceContent | None:
+    """Get the storage storname of dev from the storages of the last get_content. The storages
+    are read again once if it isn't there, None if the device has no such storage."""
+    found_stor = (dev._storages_by_name or {}).get(storname)  # pyright: ignore[reportPrivateUsage]
+    if found_stor is None:
+        _ = dev.get_content()
+        found_stor = (dev._storages_by_name or {}).get(storname)  # pyright: ignore[reportPrivateUsage]
+    return found_stor
+
+
 def walk(
     dev: PortableDevice,
     path: str,
     callback: Callable[[str], bool] | None = None,
     error_callback: Callable[[str], bool] | None = None,
+    *,
+    sort: bool = True,
+    use_cache: bool = True,
 ) -> collections.abc.Generator[tuple[str, list[PortableDeviceContent], list[PortableDeviceContent]],]:
     """Iterates ower all files in a tree just like os.walk
 
@@ -842,6 +922,10 @@ def walk(
         error_callback: when given, a function that takes one argument (the errormessage) and returns
                 a boolean. If the returned value is false, walk will cancel and return empty
                 list.
+        sort: if false the directories and files are returned in the order the device lists
+                them, faster for callers that don't need them sorted.
+        use_cache: if false all directories are read from the device even if they were read in the
+                last LISTDIR_CACHE_TTL seconds.
 
     Returns:
         A tuple with this content:
@@ -869,33 +953,27 @@ def walk(
     if not (cont := get_content_from_device_path(dev, path)):
         return
     cont.full_filename = path
-    walk_cont: list[PortableDeviceContent] = [cont]
+    walk_cont: collections.deque[PortableDeviceContent] = collections.deque([cont])
     while walk_cont:
-        cont = walk_cont[0]
-        del walk_cont[0]
+        cont = walk_cont.popleft()
         directories: list[PortableDeviceContent] = []
         files: list[PortableDeviceContent] = []
         try:
-            for child in cont.get_children():
-                if child.content_type in [
-                    WPD_CONTENT_TYPE_STORAGE,
-                    WPD_CONTENT_TYPE_DIRECTORY,
-                ]:
-                    directories.append(child)
-                elif child.content_type == WPD_CONTENT_TYPE_FILE:
-                    files.append(child)
+            for child in cont.get_children(use_cache):
                 if callback and not callback(child.full_filename):
-                    directories = []
-                    files = []
                     return
-            yield cont.full_filename, sorted(directories, key=lambda ent: ent.full_filename), sorted(
-                files, key=lambda ent: ent.full_filename
-            )
+                contenttype = child.content_type
+                if contenttype in _DIR_TYPES:
+                    directories.append(child)
+                elif contenttype == WPD_CONTENT_TYPE_FILE:
+                    files.append(child)
+            if sort:
+                directories.sort(key=_BY_PATH)
+                files.sort(key=_BY_PATH)
+            yield cont.full_filename, directories, files
         except Exception as err:
             if error_callback is not None:
                 if not error_callback(str(err)):
-                    directories = []
-                    files = []
                     return
         walk_cont.extend(directories)
 
@@ -925,18 +1003,25 @@ def makedirs(dev: PortableDevice, path: str) -> PortableDeviceContent:
         >>> dev[0].close()
     """
     try:
-        content = dev.get_content()[0]
         path = path.replace("\\", os.path.sep).replace("/", os.path.sep)
         parts = path.split(os.path.sep)
-        path_int = parts[0]
-        for dirname in parts[1:]:
+        if len(parts) < 2 or parts[1] == "":
+            return dev.get_content()[0]
+        if (content := _find_storage(dev, parts[1])) is None:
+            raise IOError(f"Error creating directory '{path}': The storage {parts[1]} could not be found")
+        # Walk down from the storage, every directory is only looked up in its parent
+        for dirname in parts[2:]:
             if dirname == "":
                 continue
-            path_int = os.path.join(path_int, dirname)
-            ziel_content = get_content_from_device_path(dev, path_int)
-            if ziel_content is None:
+            if (ziel_content := content.get_child(dirname)) is None:
                 ziel_content = content.create_content(dirname)
             content = ziel_content
         return content
     except (comtypes.COMError, ImportError) as err:  # pyright: ignore[reportAttributeAccessIssue]
         raise IOError(f"Error creating directory '{path}': {err.args[1]}")
+
+
+def clear_cache() -> None:
+    """Forget all cached listings of folders. Needed if the content of a device was changed by
+    another program before LISTDIR_CACHE_TTL seconds are over."""
+    _listdir_cache.clear()
@@ -9,7 +9,9 @@
 import sys
 import os
 import argparse
+import contextlib
 from pathlib import Path
+from typing import Callable
 
 # Handle module path for different execution contexts
 if getattr(sys, 'frozen', False):
@@ -34,6 +36,52 @@ from mtp.win_access import (
     WPD_CONTENT_TYPE_STORAGE
 )
 
+# Devices of a server or batch session, None when every command enumerates the devices itself
+_session_devices = None
+
+
+def _get_devices(refresh: bool = False):
+    """
+    Get the connected devices. In a session they are enumerated only once and stay open,
+    until list-devices asks for them again or no device was found.
+
+    Args:
+        refresh: Enumerate the devices of a session again
+
+    Returns:
+        list: The connected devices (instances of PortableDevice)
+    """
+    global _session_devices
+    if _session_devices is None:
+        return get_portable_devices()
+    if refresh or not _session_devices:
+        for device in _session_devices:
+            with contextlib.suppress(Exception):
+                device.close()
+        _session_devices = []
+        _session_devices = get_portable_devices()
+    return _session_devices
+
+
+def _release(device) -> None:
+    """Close a device after a command, the devices of a session stay open"""
+    if _session_devices is None:
+        device.close()
+
+
+@contextlib.contextmanager
+def _session():
+    """Enumerate the devices once for all commands executed inside the block"""
+    global _session_devices
+    _session_devices = []
+    try:
+        yield
+    finally:
+        for device in _session_devices:
+            with contextlib.suppress(Exception):
+                device.close()
+        _session_devices = None
+
 
 def get_mtp_devices():
     """
@@ -45,7 +93,7 @@ def get_mtp_devices():
     """
     mtp_devices = []
     try:
-        devices = get_portable_devices()
+        devices = _get_devices(refresh=True)
         for device in devices:
             try:
                 device_name = device.name
@@ -54,13 +102,15 @@ def get_mtp_devices():
             except Exception as e:
                 print(f"Error processing device: {e}")
             finally:
-                device.close()
+                _release(device)
     except Exception as e:
         print(f"Error getting MTP devices: {e}")
     return mtp_devices
 
 
-def copy_to_mtp_device(source_path: str, destination_path: str) -> None:
+def copy_to_mtp_device(
+    source_path: str, destination_path: str, on_progress: Callable[[str], None] | None = None
+) -> None:
     """
     Copy file or folder from local system to MTP device
     
@@ -68,7 +118,9 @@ def copy_to_mtp_device(source_path: str, destination_path: str) -> None:
         source_path: Local file/folder path
         destination_path: MTP destination path in format:
             "This PC\\DeviceName\\Storage\\Path\\To\\Destination"
+        on_progress: Called with a message for every copied file, default print
     """
+    report = on_progress or print
     if not os.path.exists(source_path):
         raise FileNotFoundError(f"Source path not found: {source_path}")
 
@@ -82,7 +134,7 @@ def copy_to_mtp_device(source_path: str, destination_path: str) -> None:
     
     # Find target device
     device = None
-    for dev in get_portable_devices():
+    for dev in _get_devices():
         if device_name in dev.devicename:
             device = dev
             break
@@ -109,7 +161,7 @@ def copy_to_mtp_device(source_path: str, destination_path: str) -> None:
             parent_path = os.path.dirname(full_mtp_path)
             parent_content = makedirs(device, parent_path)
             parent_content.upload_file(file_name, source_path)
-            print(f"File copied: {source_path} => {destination_path}")
+            report(f"File copied: {source_path} => {destination_path}")
         
         elif os.path.isdir(source_path):
             # Folder copy (recursive)
@@ -128,11 +180,11 @@ def copy_to_mtp_device(source_path: str, destination_path: str) -> None:
                 for file in files:
                     local_file = os.path.join(root, file)
                     mtp_dir.upload_file(file, local_file)
-                    print(f"Copied: {local_file} => {current_mtp_path}\\{file}")
+                    report(f"Copied: {local_file} => {current_mtp_path}\\{file}")
             
-            print(f"Folder copied: {source_path} => {target_path}")
+            report(f"Folder copied: {source_path} => {target_path}")
     finally:
-        device.close()
+        _release(device)
 
 
 def exists_in_mtp_device(mtp_path: str) -> bool:
@@ -154,11 +206,11 @@ def exists_in_mtp_device(mtp_path: str) -> bool:
         device_name = parts[1]
         storage_path_1 = "\\".join(parts[2:])
         
-        for device in get_portable_devices():
+        for device in _get_devices():
             if device_name in device.devicename:
                 storage_path = f"{device.devicename}\\{storage_path_1}"
                 content = get_content_from_device_path(device, storage_path)
-                device.close()
+                _release(device)
                 return content is not None
         return False
     except Exception as e:
@@ -185,7 +237,7 @@ def delete_from_mtp_device(mtp_path: str) -> bool:
         device_name = parts[1]
         storage_path_1 = "\\".join(parts[2:])
         
-        for device in get_portable_devices():
+        for device in _get_devices():
             if device_name in device.devicename:
                 storage_path = f"{device.devicename}\\{storage_path_1}"
                 content = get_content_from_device_path(device, storage_path)
@@ -201,7 +253,7 @@ def delete_from_mtp_device(mtp_path: str) -> bool:
         print(f"Deletion error: {e}")
         return False
     finally:
-        device.close()
+        _release(device)
 
 
 def get_mtp_folder_size(folder_content) -> int:
@@ -249,7 +301,7 @@ def get_mtp_item_size(mtp_path: str) -> int:
         device_name = parts[1]
         storage_path_1 = "\\".join(parts[2:])
         
-        for device in get_portable_devices():
+        for device in _get_devices():
             if device_name in device.devicename:
                 storage_path = f"{device.devicename}\\{storage_path_1}"
                 content = get_content_from_device_path(device, storage_path)
@@ -266,13 +318,112 @@ def get_mtp_item_size(mtp_path: str) -> int:
         print(f"Size retrieval error: {e}")
         return 0
     finally:
-        device.close()
+        _release(device)
+
+
+def run_command(command: str, args: list[str], on_progress: Callable[[str], None] | None = None) -> str:
+    """
+    Execute one command of the server protocol
+
+    Args:
+        command: One of list-devices, copy, exists, delete, size
+        args: The arguments of the command
+        on_progress: Gets the progress messages of copy
+
+    Returns:
+        str: The result as a single line
+    """
+    if command == "list-devices":
+        return "\t".join(f"{device_path} | {device_name}" for device_path, device_name in get_mtp_devices())
+    if command == "copy":
+        copy_to_mtp_device(*args, on_progress=on_progress)
+        return "True"
+    if command == "exists":
+        return str(exists_in_mtp_device(*args))
+    if command == "delete":
+        return str(delete_from_mtp_device(*args))
+    if command == "size":
+        return str(get_mtp_item_size(*args))
+    raise ValueError(f"Unknown command: {command}")
+
+
+def answer(line: str, on_progress: Callable[[str], None] | None = None) -> str:
+    """
+    Execute one request line and build the reply line
+
+    Args:
+        line: The command and its arguments separated by tabs,
+            for example "copy\t<source>\t<destination>"
+        on_progress: Gets the progress messages of copy, default print
+
+    Returns:
+        str: "OK <result>" or "ERR <message>". Messages printed while the
+            command runs are written to stderr so they can't break the protocol.
+    """
+    command, *args = line.split("\t")
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            reply = f"OK {run_command(command, args, on_progress)}"
+    except Exception as e:
+        reply = f"ERR {e}"
+    return reply.replace("\n", " ")
+
+
+def serve() -> None:
+    """
+    Read requests from stdin until it is closed and answer every request
+    with exactly one line (see answer). Before the answer a copy writes a
+    "PROGRESS <message>" line for every copied file.
+    """
+    sys.stdin.reconfigure(encoding="utf-8")
+    sys.stdout.reconfigure(encoding="utf-8")
+    replies = sys.stdout
+
+    def progress(message: str) -> None:
+        replies.write("PROGRESS " + message.replace("\n", " ") + "\n")
+        replies.flush()
+
+    with _session():
+        for line in sys.stdin:
+            line = line.rstrip("\r\n")
+            if not line:
+                continue
+            replies.write(answer(line, progress) + "\n")
+            replies.flush()
+
+
+def run_batch(batch_file: str) -> bool:
+    """
+    Execute all requests of a batch file (see answer) and print one reply per request
+
+    Args:
+        batch_file: File with one request per line, "-" for stdin
+
+    Returns:
+        bool: True if all requests succeeded
+    """
+    if batch_file == "-":
+        sys.stdin.reconfigure(encoding="utf-8")
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(batch_file, encoding="utf-8") as inp:
+            lines = inp.read().splitlines()
+    success = True
+    with _session():
+        for line in lines:
+            if not line:
+                continue
+            reply = answer(line)
+            success = success and reply.startswith("OK ")
+            print(reply)
+    return success
 
 
 def main():
     """Command-line interface for MTP operations"""
     parser = argparse.ArgumentParser(description="MTP Device File Manager")
-    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser.add_argument("--server", action="store_true", help="Read commands from stdin, one per line")
+    subparsers = parser.add_subparsers(dest="command")
 
     # List devices command
     list_parser = subparsers.add_parser("list-devices", help="List connected MTP devices")
@@ -294,7 +445,16 @@ def main():
     size_parser = subparsers.add_parser("size", help="Get size of MTP path")
     size_parser.add_argument("path", help="MTP path to get size of")
 
+    # Batch command
+    batch_parser = subparsers.add_parser("batch", help="Execute tab separated commands from a file")
+    batch_parser.add_argument("file", help="File with one command per line, - for stdin")
+
     args = parser.parse_args()
+    if args.server:
+        serve()
+        return
+    if args.command is None:
+        parser.error("a command is required")
 
     try:
         if args.command == "list-devices":
@@ -319,6 +479,9 @@ def main():
             size = get_mtp_item_size(args.path)
             print(size)
 
+        elif args.command == "batch":
+            sys.exit(0 if run_batch(args.file) else 1)
+
     except Exception as e:
         print(f"Error: {str(e)}")
         sys.exit(1)